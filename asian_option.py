@@ -1,9 +1,13 @@
 from option_types import OptionType
+import numpy as np
+from scipy.stats import norm
 
 
 class AsianOption:
     """ Asian Option """
 
+    path_dependent = True
+
     def __init__(self, strike, option_type = OptionType.CALL):
         self.strike = strike
         self.option_type = option_type
@@ -18,3 +22,68 @@ class AsianOption:
     def payoff_from_series(self, series):
         avg_asset_price = series.mean()
         return self.payoff(avg_asset_price)
+
+    def payoff_averages(self, paths, history=None):
+        """ Average asset price of every path, including the observations of history if given. """
+        if history is None:
+            return paths.mean(axis=1)
+        return (history.total + paths.sum(axis=1)) / (history.count + paths.shape[1])
+
+    def payoff_from_paths(self, paths, history=None):
+        """ Vectorized payoff for an array of asset price paths (one path per row). The observations of
+            history (a PathHistory of a trade in progress) are taken into account if given. """
+        avg_asset_prices = self.payoff_averages(paths, history)
+        if self.option_type == OptionType.CALL:
+            return np.maximum(avg_asset_prices - self.strike, 0)
+        if self.option_type == OptionType.PUT:
+            return np.maximum(self.strike - avg_asset_prices, 0)
+        return np.zeros(len(paths))
+
+    def payoff_gradient_from_paths(self, paths, history=None):
+        """ Derivative of the payoff with respect to every asset price of paths, for pathwise Greeks. """
+        avg_asset_prices = self.payoff_averages(paths, history)[:, None]
+        n = paths.shape[1] + (0 if history is None else history.count)
+        if self.option_type == OptionType.CALL:
+            return np.broadcast_to((avg_asset_prices > self.strike) / n, paths.shape)
+        if self.option_type == OptionType.PUT:
+            return np.broadcast_to(np.where(avg_asset_prices < self.strike, -1.0 / n, 0.0), paths.shape)
+        return np.zeros(paths.shape)
+
+    def geometric_average_price(self, asset_price, sigma, r, times, D=0):
+        """ Calculates the value of the Asian option on the geometric average of the asset prices observed
+            at times. The logarithm of the geometric average is normally distributed, so the price is
+            known in closed form.
+
+        Arguments:
+            asset_price: current asset price
+            sigma: volatility of underlying asset in std-deviations of returns
+            r: the risk-free interest rate
+            times: increasing observation times in years from now, the last one being the maturity
+            D: cumulative dividends of underlying asset payed until maturity of the option
+        """
+
+        times = np.asarray(times, dtype=float)
+        n = len(times)
+        # Sum of min(t_i, t_j) over all pairs of observation times
+        covariance_sum = ((2 * (n - np.arange(n)) - 1) * times).sum()
+        m = np.log(asset_price) + (r - D - 1 / 2 * sigma ** 2) * times.mean()
+        v = sigma ** 2 * covariance_sum / n ** 2
+        d1 = (m - np.log(self.strike) + v) / np.sqrt(v)
+        d2 = d1 - np.sqrt(v)
+        discount = np.exp(-r * times[-1])
+        if self.option_type == OptionType.CALL:
+            return discount * (np.exp(m + v / 2) * norm.cdf(d1) - self.strike * norm.cdf(d2))
+        if self.option_type == OptionType.PUT:
+            return discount * (self.strike * norm.cdf(-d2) - np.exp(m + v / 2) * norm.cdf(-d1))
+        return 0
+
+    def control_variate(self, paths, times, asset_price, sigma, mu):
+        """ Control variate for Monte Carlo pricing: the Asian option on the geometric average, whose
+            expected payoff is known in closed form. Returns the control value of each path and its
+            expectation. """
+        geometric_averages = np.exp(np.log(paths).mean(axis=1))
+        if self.option_type == OptionType.CALL:
+            controls = np.maximum(geometric_averages - self.strike, 0)
+        else:
+            controls = np.maximum(self.strike - geometric_averages, 0)
+        return (controls, self.geometric_average_price(asset_price, sigma, mu, times) * np.exp(mu * times[-1]))
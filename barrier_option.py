@@ -1,9 +1,14 @@
 from option_types import OptionType
+from option import vanilla_control_variate
+import numpy as np
+from scipy.stats import norm
 
 
 class BarrierOption:
     """ Barrier Option """
 
+    path_dependent = True
+
     (KNOCK_IN, KNOCK_OUT) = range(2)
     (UP, DOWN) = range(2)
 
@@ -44,3 +49,137 @@ class BarrierOption:
         min_asset_price = series.min()
         return self.payoff(last_asset_price, max_asset_price, min_asset_price)
 
+    def calc_payoffs(self, asset_prices):
+        if self.option_type == OptionType.CALL:
+            return np.maximum(asset_prices - self.strike, 0)
+        elif self.option_type == OptionType.PUT:
+            return np.maximum(self.strike - asset_prices, 0)
+        return np.zeros(len(asset_prices))
+
+    def barrier_condition(self, max_asset_prices, min_asset_prices):
+        """ Returns a boolean mask of the paths for which the option pays out. """
+        if self.barrier_type == self.KNOCK_OUT:
+            if self.barrier_level == self.UP:
+                return max_asset_prices < self.barrier
+            elif self.barrier_level == self.DOWN:
+                return min_asset_prices > self.barrier
+        elif self.barrier_type == self.KNOCK_IN:
+            if self.barrier_level == self.UP:
+                return max_asset_prices > self.barrier
+            elif self.barrier_level == self.DOWN:
+                return min_asset_prices < self.barrier
+        return np.zeros(len(max_asset_prices), dtype=bool)
+
+    def payoff_from_paths(self, paths, history=None):
+        """ Vectorized payoff for an array of asset price paths (one path per row). The observations of
+            history (a PathHistory of a trade in progress) are taken into account if given. """
+        max_asset_prices = paths.max(axis=1)
+        min_asset_prices = paths.min(axis=1)
+        if history is not None:
+            max_asset_prices = np.maximum(max_asset_prices, history.maximum)
+            min_asset_prices = np.minimum(min_asset_prices, history.minimum)
+        active = self.barrier_condition(max_asset_prices, min_asset_prices)
+        return np.where(active, self.calc_payoffs(paths[:, -1]), 0)
+
+    def barrier_touched(self, history):
+        if self.barrier_level == self.UP:
+            return history.maximum >= self.barrier
+        return history.minimum <= self.barrier
+
+    def survival_probabilities(self, paths, times, sigma):
+        """ Probability of each path not to touch the barrier under continuous monitoring, given the asset
+            prices at times. Between two grid points the log asset price is a Brownian bridge, which
+            crosses the barrier with probability exp(-2 * log(H/S_i) * log(H/S_i+1) / (sigma^2 * dt)).
+        """
+
+        if self.barrier_level == self.UP:
+            distances = np.log(self.barrier / paths)
+        else:
+            distances = np.log(paths / self.barrier)
+        touched = (distances <= 0).any(axis=1)
+        distances = np.maximum(distances, 0)
+        dt = np.diff(times)
+        crossing_probabilities = np.exp(-2 * distances[:, :-1] * distances[:, 1:] / (sigma ** 2 * dt))
+        survival = np.prod(1 - crossing_probabilities, axis=1)
+        return np.where(touched, 0, survival)
+
+    def continuous_payoff_from_paths(self, paths, times, sigma, history=None):
+        """ Vectorized payoff of the continuously monitored barrier option, given the asset prices at
+            times: the payoff at maturity weighted with the probability of the barrier condition, with
+            Brownian bridge crossing probabilities between the grid points. A barrier touched within
+            history (a PathHistory of a trade in progress) has been crossed on every path. """
+
+        survival = self.survival_probabilities(paths, times, sigma)
+        if history is not None and self.barrier_touched(history):
+            survival = np.zeros(len(paths))
+        if self.barrier_type == self.KNOCK_IN:
+            return self.calc_payoffs(paths[:, -1]) * (1 - survival)
+        return self.calc_payoffs(paths[:, -1]) * survival
+
+    def black_scholes_price(self, asset_price, sigma, r, time_to_maturity=1, D=0, strike=None, barrier=None):
+        """ Calculates value of the continuously monitored barrier option according to the formulas of
+            Reiner and Rubinstein (see Haug 2007: The Complete Guide to Option Pricing Formulas, p. 152ff).
+
+        Arguments:
+            asset_price: current asset price
+            sigma: volatility of underlying asset in std-deviations of returns
+            r: the risk-free interest rate
+            time_to_maturity: time to maturity in years
+            D: cumulative dividends of underlying asset payed until maturity of the option
+            strike: strike of the option (Default: strike of this option)
+            barrier: barrier of the option (Default: barrier of this option)
+
+        All numeric arguments may be NumPy arrays, which are broadcast against each other to price a whole
+        grid of contracts in one call.
+        """
+
+        S = np.asarray(asset_price, dtype=float)
+        X = np.asarray(self.strike if strike is None else strike, dtype=float)
+        H = np.asarray(self.barrier if barrier is None else barrier, dtype=float)
+        t = time_to_maturity
+        b = r - D
+        phi = 1 if self.option_type == OptionType.CALL else -1
+        eta = 1 if self.barrier_level == self.DOWN else -1
+
+        m = (b - sigma ** 2 / 2) / sigma ** 2
+        s = sigma * np.sqrt(t)
+        x1 = np.log(S / X) / s + (1 + m) * s
+        x2 = np.log(S / H) / s + (1 + m) * s
+        y1 = np.log(H ** 2 / (S * X)) / s + (1 + m) * s
+        y2 = np.log(H / S) / s + (1 + m) * s
+        A = phi * S * np.exp((b - r) * t) * norm.cdf(phi * x1) - phi * X * np.exp(-r * t) * norm.cdf(phi * x1 - phi * s)
+        B = phi * S * np.exp((b - r) * t) * norm.cdf(phi * x2) - phi * X * np.exp(-r * t) * norm.cdf(phi * x2 - phi * s)
+        C = phi * S * np.exp((b - r) * t) * (H / S) ** (2 * (m + 1)) * norm.cdf(eta * y1) - \
+            phi * X * np.exp(-r * t) * (H / S) ** (2 * m) * norm.cdf(eta * y1 - eta * s)
+        E = phi * S * np.exp((b - r) * t) * (H / S) ** (2 * (m + 1)) * norm.cdf(eta * y2) - \
+            phi * X * np.exp(-r * t) * (H / S) ** (2 * m) * norm.cdf(eta * y2 - eta * s)
+
+        # Prices for strike above and below the barrier; A is the plain vanilla price
+        call = self.option_type == OptionType.CALL
+        if self.barrier_type == self.KNOCK_IN:
+            if self.barrier_level == self.DOWN:
+                (above, below) = (C, A - B + E) if call else (B - C + E, A)
+            else:
+                (above, below) = (A, B - C + E) if call else (A - B + E, C)
+        else:
+            if self.barrier_level == self.DOWN:
+                (above, below) = (A - C, B - E) if call else (A - B + C - E, 0 * A)
+            else:
+                (above, below) = (0 * A, A - B + C - E) if call else (B - E, A - C)
+        price = np.where(X > H, above, below)
+
+        # The barrier has been reached already
+        if self.barrier_level == self.UP:
+            touched = S >= H
+        else:
+            touched = S <= H
+        if self.barrier_type == self.KNOCK_IN:
+            price = np.where(touched, A, price)
+        else:
+            price = np.where(touched, 0, price)
+        return price[()]
+
+    def control_variate(self, paths, times, asset_price, sigma, mu):
+        """ Control variate: the plain vanilla option with the same strike (see vanilla_control_variate). """
+        return vanilla_control_variate(self.strike, self.option_type, paths, times, asset_price, sigma, mu)
+
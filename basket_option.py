@@ -0,0 +1,30 @@
+from option_types import OptionType
+import numpy as np
+
+
+class BasketOption:
+    """ Basket Call or Put Option on the weighted sum of several asset prices """
+
+    path_dependent = False
+
+    def __init__(self, strike, weights, option_type=OptionType.CALL):
+        self.strike = strike
+        self.weights = np.asarray(weights, dtype=float)
+        self.option_type = option_type
+
+    def payoff(self, asset_prices):
+        basket_value = np.dot(self.weights, asset_prices)
+        if self.option_type == OptionType.CALL:
+            return max(basket_value - self.strike, 0)
+        elif self.option_type == OptionType.PUT:
+            return max(self.strike - basket_value, 0)
+        return 0
+
+    def payoff_from_paths(self, paths):
+        """ Vectorized payoff for an (assets x simulations x steps+1) array of asset price paths. """
+        basket_values = self.weights @ paths[:, :, -1]
+        if self.option_type == OptionType.CALL:
+            return np.maximum(basket_values - self.strike, 0)
+        elif self.option_type == OptionType.PUT:
+            return np.maximum(self.strike - basket_values, 0)
+        return np.zeros(paths.shape[1])
@@ -0,0 +1,240 @@
+from option_pricer import OptionPricer
+from option_shortcuts import OPTION_NAMES, create_option, reference_price
+from parallel_executor import ParallelExecutor
+from instrumentation import Instrumentation
+from optparse import OptionParser
+import pandas as pd
+import numpy as np
+import json
+import time
+import os
+
+
+# Columns of the input file. Market columns missing in the file (or empty in a row) take the defaults
+# given on the command line. Rows with equal market parameters are priced from one shared set of paths.
+MARKET_COLUMNS = ["asset", "sigma", "rate", "start_time", "maturity"]
+CONTRACT_COLUMNS = ["option_code", "strike", "barrier", "binary_payoff", "sample_interval"]
+
+
+def read_table(filename):
+    """ Reads a table from a CSV (.csv), JSON (.json, list of records), JSON lines (.jsonl) or Parquet
+        (.parquet) file. """
+
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".json":
+        return pd.read_json(filename, orient="records")
+    if extension == ".jsonl":
+        return pd.read_json(filename, orient="records", lines=True)
+    if extension == ".parquet":
+        return pd.read_parquet(filename)
+    return pd.read_csv(filename)
+
+
+def write_table(table, filename):
+    """ Writes table column by column to a CSV (.csv), JSON (.json, one list per column) or Parquet
+        (.parquet) file. """
+
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".json":
+        columns = {column: [None if pd.isnull(value) else value for value in table[column].tolist()]
+                   for column in table.columns}
+        with open(filename, "w") as outfile:
+            json.dump(columns, outfile)
+    elif extension == ".parquet":
+        table.to_parquet(filename, index=False)
+    else:
+        table.to_csv(filename, index=False)
+
+
+def optional(value):
+    return None if pd.isnull(value) else value
+
+
+def prepare_contracts(contracts, defaults):
+    """ Fills in missing market and contract columns with defaults (a dictionary by column name). """
+
+    if "option_code" not in contracts.columns:
+        raise ValueError("The input has no option_code column")
+    contracts = contracts.copy()
+    for column in MARKET_COLUMNS + CONTRACT_COLUMNS[1:]:
+        default = defaults.get(column, np.nan)
+        if column not in contracts.columns:
+            contracts[column] = default
+        elif default is not None:
+            contracts[column] = contracts[column].fillna(default)
+    unknown_codes = set(contracts["option_code"]) - set(OPTION_NAMES)
+    if unknown_codes:
+        raise ValueError("Unknown option codes: %s" % ", ".join(sorted(map(str, unknown_codes))))
+    return contracts
+
+
+def create_group_pricer(option_pricer, market, seed):
+    """ Returns a clone of option_pricer with the market parameters of a group of contracts. """
+
+    (asset, sigma, rate, start_time, maturity) = market
+    group_pricer = option_pricer.clone(seed)
+    group_pricer.set_init_asset_price(asset)
+    group_pricer.set_sigma(sigma)
+    group_pricer.set_risk_free_rate(rate)
+    group_pricer.set_mu(rate)
+    group_pricer.set_start_time(start_time)
+    group_pricer.set_maturity(maturity)
+    return group_pricer
+
+
+def price_group(option_pricer, options, sample_distances, simulations, steps):
+    """ Prices options (sampled every sample_distances[i], None for continuous sampling) from one
+        shared set of paths. Returns the arrays of prices and standard errors. """
+
+    option_pricer.run_monte_carlo_simulations(simulations, option_pricer.required_steps(options, steps))
+    time_to_maturity = option_pricer.maturity - option_pricer.start_time
+
+    prices = np.empty(len(options))
+    standard_errors = np.empty(len(options))
+    for sample_distance in set(sample_distances):
+        positions = [i for (i, d) in enumerate(sample_distances) if d == sample_distance]
+        results = option_pricer.price_options([options[i] for i in positions], time_to_maturity, sample_distance)
+        prices[positions] = [result.price for result in results]
+        standard_errors[positions] = [result.standard_error for result in results]
+    return (prices, standard_errors)
+
+
+def price_contracts(option_pricer, contracts, simulations=10000, steps=100, executor=None, seed=None):
+    """ Prices every row of contracts (a DataFrame with the MARKET_COLUMNS and CONTRACT_COLUMNS) and
+        returns it with the columns name, price, standard_error, reference_price and paths added.
+
+        Rows are grouped by their market parameters and every group is priced from its own set of paths,
+        simulated once on the executor (Default: in the calling process). Identical contracts within a group
+        are priced once. Every group gets its own random number stream spawned from seed, so results do not
+        depend on the number of workers.
+    """
+
+    executor = executor if executor is not None else ParallelExecutor(1)
+    groups = list(contracts.groupby(MARKET_COLUMNS, sort=False).indices.items())
+    seeds = ParallelExecutor.spawn_seeds(seed, len(groups))
+
+    columns = [contracts[column].to_numpy() for column in CONTRACT_COLUMNS]
+    tasks = []
+    row_positions = []
+    for ((market, rows), group_seed) in zip(groups, seeds):
+        unique_contracts = {}
+        positions = np.empty(len(rows), dtype=int)
+        for (i, row) in enumerate(rows):
+            contract = tuple(optional(values[row]) for values in columns)
+            positions[i] = unique_contracts.setdefault(contract, len(unique_contracts))
+        options = [create_option(option_code, strike, barrier, binary_payoff)
+                   for (option_code, strike, barrier, binary_payoff, _) in unique_contracts]
+        sample_distances = [sample_interval for (_, _, _, _, sample_interval) in unique_contracts]
+        tasks.append((create_group_pricer(option_pricer, market, group_seed), options, sample_distances,
+                      simulations, steps))
+        row_positions.append((rows, positions))
+
+    prices = np.empty(len(contracts))
+    standard_errors = np.empty(len(contracts))
+    reference_prices = np.empty(len(contracts))
+    for ((group_prices, group_standard_errors), (rows, positions), task) in \
+            zip(executor.map(price_group, tasks), row_positions, tasks):
+        (group_pricer, options) = task[:2]
+        prices[rows] = group_prices[positions]
+        standard_errors[rows] = group_standard_errors[positions]
+        reference_prices[rows] = np.array([reference_price(option, group_pricer.init_asset_price,
+                                                           group_pricer.sigma, group_pricer.risk_free_rate,
+                                                           group_pricer.maturity - group_pricer.start_time)
+                                           for option in options])[positions]
+
+    result = contracts.copy()
+    result["name"] = contracts["option_code"].map(OPTION_NAMES)
+    result["price"] = prices
+    result["standard_error"] = standard_errors
+    result["reference_price"] = reference_prices
+    result["paths"] = simulations
+    return result
+
+
+if __name__ == "__main__":
+
+    parser = OptionParser(usage="usage: %prog [options] input output\n\n"
+                                "Prices the contracts of input (.csv, .json, .jsonl or .parquet) and writes them with "
+                                "their prices to output (.csv, .json or .parquet). Input columns: " +
+                                ", ".join(CONTRACT_COLUMNS + MARKET_COLUMNS) + " (only option_code is required).")
+    parser.add_option("-r", "--rate", dest="r", type="float",
+                      help="Default risk-free interest rate (Default: 0.05)", default=0.05)
+    parser.add_option("-a", "--asset", dest="asset", type="float",
+                      help="Default initial asset price (Default: 100)", default=100)
+    parser.add_option("-s", "--sigma", dest="sigma", type="float",
+                      help="Default sigma (Default: 0.2)", default=0.2)
+    parser.add_option("-t", "--start_time", dest="start_time", type="float",
+                      help="Default start time (Default: 0)", default=0)
+    parser.add_option("-m", "--maturity", dest="maturity", type="float",
+                      help="Default maturity in years (Default: 1)", default=1)
+    parser.add_option("-k", "--strike", dest="strike", type="float",
+                      help="Default strike (Default: 120)", default=120)
+    parser.add_option("-p", "--binary_payoff", dest="binary_payoff", type="float",
+                      help="Default payoff of binary options (Default: 100)", default=100)
+    parser.add_option("-i", dest="sample_interval", type="float",
+                      help="Default sample interval for discrete sampling (Default: continuous sampling)",
+                      default=None)
+    parser.add_option("--sim", dest="simulations", type="int",
+                      help="Number of Monte Carlo simulations per group of market parameters (Default: 10000)",
+                      default=10000)
+    parser.add_option("--steps", dest="steps", type="int",
+                      help="Number of price movements within each MC simulation (Default: 100)", default=100)
+    parser.add_option("--scheme", dest="scheme", type="choice", choices=["euler", "exact"],
+                      help="Discretisation scheme of the asset price: euler or exact (Default: exact)",
+                      default="exact")
+    parser.add_option("--sobol", dest="sobol", action="store_true",
+                      help="Use scrambled Sobol points with Brownian bridge construction", default=False)
+    parser.add_option("--antithetic", dest="antithetic", action="store_true",
+                      help="Use antithetic variates", default=False)
+    parser.add_option("--control_variates", dest="control_variates", action="store_true",
+                      help="Use control variates", default=False)
+    parser.add_option("--barrier_correction", dest="barrier_correction", action="store_true",
+                      help="Price barrier options as continuously monitored (Brownian bridge correction)",
+                      default=False)
+    parser.add_option("--workers", dest="workers", type="int",
+                      help="Number of worker processes (Default: 1)", default=1)
+    parser.add_option("--seed", dest="seed", type="int",
+                      help="Seed of the random number generator (Default: none)", default=None)
+    parser.add_option("--report", dest="report", type="string",
+                      help="Record phase timings, counters and memory and write them as JSON to this file "
+                           "(Default: no instrumentation)", default=None)
+
+    (opts, args) = parser.parse_args()
+    if len(args) != 2:
+        parser.error("input and output file expected")
+    (input_filename, output_filename) = args
+
+    defaults = {
+        "asset": opts.asset,
+        "sigma": opts.sigma,
+        "rate": opts.r,
+        "start_time": opts.start_time,
+        "maturity": opts.maturity,
+        "strike": opts.strike,
+        "binary_payoff": opts.binary_payoff,
+        "sample_interval": opts.sample_interval,
+        "barrier": None
+    }
+
+    option_pricer = OptionPricer()
+    option_pricer.set_scheme(OptionPricer.EXACT if opts.scheme == "exact" else OptionPricer.EULER)
+    option_pricer.set_sequence(OptionPricer.SOBOL if opts.sobol else OptionPricer.PSEUDO_RANDOM)
+    option_pricer.set_antithetic(opts.antithetic)
+    option_pricer.set_control_variates(opts.control_variates)
+    option_pricer.set_barrier_correction(opts.barrier_correction)
+    instrumentation = None
+    if opts.report is not None:
+        instrumentation = Instrumentation()
+        option_pricer.set_instrumentation(instrumentation)
+
+    start = time.perf_counter()
+    contracts = prepare_contracts(read_table(input_filename), defaults)
+    with ParallelExecutor(opts.workers) as executor:
+        result = price_contracts(option_pricer, contracts, opts.simulations, opts.steps, executor, opts.seed)
+    write_table(result, output_filename)
+    print("Priced %d contracts in %d groups in %.2f s" %
+          (len(result), result.groupby(MARKET_COLUMNS, sort=False).ngroups, time.perf_counter() - start))
+
+    if instrumentation is not None:
+        with open(opts.report, "w") as outfile:
+            json.dump(instrumentation.report(), outfile, indent=2)
@@ -0,0 +1,297 @@
+from option_pricer import OptionPricer
+from option import Option
+from binary_option import BinaryOption
+from barrier_option import BarrierOption
+from asian_option import AsianOption
+from fixed_lookback_option import FixedLookbackOption
+from floating_lookback_option import FloatingLookbackOption
+from simulation import Simulation, SimulationParameters
+from greeks import GreeksCalculator
+from plot_sink import MatplotlibPlotSink
+from optparse import OptionParser
+import numpy as np
+import subprocess
+import tempfile
+import platform
+import tracemalloc
+import json
+import time
+import os
+
+
+def measure(function, repeats=3):
+    """ Returns (best wall time in seconds, peak memory in bytes) of calling function. The peak memory is
+        traced in a separate call, so tracing does not distort the timings. """
+
+    timings = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function()
+    (_, peak_memory) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (min(timings), peak_memory)
+
+
+def record(benchmark, seconds, peak_memory, simulations, steps, **fields):
+    result = {
+        "benchmark": benchmark,
+        "simulations": simulations,
+        "steps": steps,
+        "seconds": seconds,
+        "paths_per_second": simulations / seconds if seconds > 0 else None,
+        "peak_memory_bytes": peak_memory
+    }
+    result.update(fields)
+    print("%-20s %-26s N=%-8d steps=%-5d %10.4f s %14.0f paths/s %10.1f MB" %
+          (benchmark, fields.get("option", ""), simulations, steps, seconds,
+           result["paths_per_second"] or 0, peak_memory / 1024 ** 2))
+    return result
+
+
+def create_option_pricer(asset_price, sigma, r, seed):
+    option_pricer = OptionPricer()
+    option_pricer.set_risk_free_rate(r)
+    option_pricer.set_init_asset_price(asset_price)
+    option_pricer.set_mu(r)
+    option_pricer.set_sigma(sigma)
+    option_pricer.set_seed(seed)
+    return option_pricer
+
+
+def benchmark_path_generation(option_pricer, list_of_simulations, list_of_steps, repeats):
+    results = []
+    for steps in list_of_steps:
+        for N in list_of_simulations:
+            for (scheme_name, scheme) in (("euler", OptionPricer.EULER), ("exact", OptionPricer.EXACT)):
+                option_pricer.set_scheme(scheme)
+                (seconds, peak_memory) = measure(lambda: option_pricer.run_monte_carlo_simulations(N, steps), repeats)
+                results.append(record("path_generation", seconds, peak_memory, N, steps, scheme=scheme_name))
+    option_pricer.set_scheme(OptionPricer.EULER)
+    return results
+
+
+def benchmark_payoffs(option_pricer, options, list_of_simulations, list_of_steps, repeats):
+    results = []
+    for steps in list_of_steps:
+        for N in list_of_simulations:
+            option_pricer.run_monte_carlo_simulations(N, steps)
+            for (name, option) in options:
+                (seconds, peak_memory) = measure(lambda: option_pricer.payoffs_from_paths(option, option_pricer.paths),
+                                                 repeats)
+                results.append(record("payoff_evaluation", seconds, peak_memory, N, steps, option=name))
+    return results
+
+
+def benchmark_sampling(option_pricer, list_of_simulations, list_of_steps, sample_interval, repeats):
+    results = []
+    for steps in list_of_steps:
+        for N in list_of_simulations:
+            option_pricer.run_monte_carlo_simulations(N, steps)
+            (seconds, peak_memory) = measure(
+                lambda: option_pricer.sample_paths(option_pricer.paths, option_pricer.time_grid, sample_interval),
+                repeats)
+            results.append(record("discrete_sampling", seconds, peak_memory, N, steps,
+                                  sample_interval=sample_interval))
+    return results
+
+
+def benchmark_simulation_run(option_pricer, options, list_of_simulations, list_of_steps, runs, sample_interval,
+                             plots=False):
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        # Simulation writes result files and plots into the working directory
+        os.chdir(directory)
+        try:
+            plot_sink = MatplotlibPlotSink() if plots else None
+            simulation = Simulation(option_pricer, plot_sink=plot_sink)
+            params = SimulationParameters()
+            params.runs = runs
+            params.sample_interval = sample_interval
+            for steps in list_of_steps:
+                for N in list_of_simulations:
+                    params.simulations = N
+                    params.steps = steps
+                    for (name, option) in options:
+                        params.option = option
+                        params.option_name = name
+                        params.option_real_price = 0
+                        (seconds, peak_memory) = measure(lambda: simulation.run(params), 1)
+                        results.append(record("simulation_run", seconds, peak_memory, N * runs, steps,
+                                              option=name, runs=runs, plots=plots))
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+QMC_SCRAMBLES = 16
+
+
+def benchmark_error_vs_time(option_pricer, asset_price, sigma, r, list_of_simulations, steps):
+    """ Error of the price of a plain vanilla call against its Black-Scholes price and wall time, for
+        increasing numbers of paths and the available variance reduction methods. Sobol paths are priced
+        with randomised quasi-Monte Carlo from QMC_SCRAMBLES scrambles of N / QMC_SCRAMBLES paths each. """
+
+    option = Option(asset_price)
+    real_price = option.black_scholes_price(asset_price, sigma, r)
+    methods = [("plain", OptionPricer.PSEUDO_RANDOM, False, False),
+               ("antithetic", OptionPricer.PSEUDO_RANDOM, True, False),
+               ("control_variates", OptionPricer.PSEUDO_RANDOM, False, True),
+               ("sobol", OptionPricer.SOBOL, False, False)]
+
+    results = []
+    option_pricer.set_scheme(OptionPricer.EXACT)
+    for (method, sequence, antithetic, control_variates) in methods:
+        option_pricer.set_sequence(sequence)
+        option_pricer.set_antithetic(antithetic)
+        option_pricer.set_control_variates(control_variates)
+        for N in list_of_simulations:
+            start = time.perf_counter()
+            if sequence == OptionPricer.SOBOL:
+                # Sobol points are not independent: the standard error is only meaningful across scrambles
+                result = option_pricer.price_option_randomized_qmc(option, simulations=max(1, N // QMC_SCRAMBLES),
+                                                                   steps=steps, scrambles=QMC_SCRAMBLES)
+            else:
+                option_pricer.run_monte_carlo_simulations(N, steps)
+                result = option_pricer.price_option(option)
+            seconds = time.perf_counter() - start
+            results.append({
+                "benchmark": "error_vs_time",
+                "method": method,
+                "simulations": N,
+                "steps": steps,
+                "seconds": seconds,
+                "error": abs(result.price - real_price),
+                "standard_error": result.standard_error
+            })
+            print("%-20s %-26s N=%-8d %10.4f s  error %.5f  std error %.5f" %
+                  ("error_vs_time", method, N, seconds, abs(result.price - real_price), result.standard_error))
+
+    option_pricer.set_scheme(OptionPricer.EULER)
+    option_pricer.set_sequence(OptionPricer.PSEUDO_RANDOM)
+    option_pricer.set_antithetic(False)
+    option_pricer.set_control_variates(False)
+    return results
+
+
+def benchmark_greeks(asset_price, sigma, r, seed, simulations, steps):
+    """ Delta and gamma of GreeksCalculator against central finite differences of the Monte Carlo price,
+        with common random numbers: the bumped prices are simulated with the same seed. The strike of the
+        fixed lookback option is out of the money, since its discretely monitored price has a kink at
+        strike = asset_price. """
+
+    options = [("Option", Option(asset_price)),
+               ("AsianOption", AsianOption(asset_price)),
+               ("FixedLookbackOption", FixedLookbackOption(1.1 * asset_price)),
+               ("FloatingLookbackOption", FloatingLookbackOption())]
+    bump = 0.01 * asset_price
+
+    def monte_carlo_price(option, spot):
+        option_pricer = create_option_pricer(spot, sigma, r, seed)
+        option_pricer.set_scheme(OptionPricer.EXACT)
+        option_pricer.run_monte_carlo_simulations(simulations, steps)
+        return option_pricer.price_option(option).price
+
+    results = []
+    for (name, option) in options:
+        option_pricer = create_option_pricer(asset_price, sigma, r, seed)
+        option_pricer.set_scheme(OptionPricer.EXACT)
+        option_pricer.run_monte_carlo_simulations(simulations, steps)
+        greeks = GreeksCalculator(option_pricer).calculate(option)
+        (down, middle, up) = [monte_carlo_price(option, spot)
+                              for spot in (asset_price - bump, asset_price, asset_price + bump)]
+        delta = (up - down) / (2 * bump)
+        gamma = (up - 2 * middle + down) / bump ** 2
+        results.append({
+            "benchmark": "greeks_vs_finite_differences",
+            "option": name,
+            "simulations": simulations,
+            "steps": steps,
+            "method": greeks.method,
+            "delta": greeks.delta,
+            "finite_difference_delta": delta,
+            "gamma": greeks.gamma,
+            "finite_difference_gamma": gamma
+        })
+        print("%-20s %-26s delta %.5f (fd %.5f)  gamma %.5f (fd %.5f)" %
+              ("greeks", name, greeks.delta, delta, greeks.gamma, gamma))
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+
+    parser = OptionParser()
+    parser.add_option("--sim", dest="simulations", type="string",
+                      help="List of numbers of Monte Carlo simulations (Default: 1000,10000,100000)",
+                      default="1000,10000,100000")
+    parser.add_option("--steps", dest="steps", type="string",
+                      help="List of numbers of steps (Default: 10,100)", default="10,100")
+    parser.add_option("--repeats", dest="repeats", type="int",
+                      help="Repetitions of each timing, the best one is reported (Default: 3)", default=3)
+    parser.add_option("--runs", dest="runs", type="int",
+                      help="Runs of the Simulation.run benchmark (Default: 5)", default=5)
+    parser.add_option("-i", dest="sample_interval", type="float",
+                      help="Sample interval for discrete sampling (Default: 0.1)", default=0.1)
+    parser.add_option("--seed", dest="seed", type="int",
+                      help="Seed of the random number generator (Default: 1)", default=1)
+    parser.add_option("--skip_simulation", dest="skip_simulation", action="store_true",
+                      help="Skip the Simulation.run benchmark", default=False)
+    parser.add_option("--plots", dest="plots", action="store_true",
+                      help="Include plotting of the error histograms in the Simulation.run benchmark", default=False)
+    parser.add_option("--output", dest="output", type="string",
+                      help="JSON result file (Default: benchmark.json)", default="benchmark.json")
+
+    (opts, args) = parser.parse_args()
+
+    asset_price = 100
+    sigma = 0.2
+    r = 0.05
+    list_of_simulations = [int(x) for x in opts.simulations.split(",")]
+    list_of_steps = [int(x) for x in opts.steps.split(",")]
+
+    options = [
+        ("Option", Option(asset_price)),
+        ("BinaryOption", BinaryOption(asset_price, payoff=100)),
+        ("BarrierOption", BarrierOption(asset_price, 1.2 * asset_price)),
+        ("AsianOption", AsianOption(asset_price)),
+        ("FixedLookbackOption", FixedLookbackOption(asset_price)),
+        ("FloatingLookbackOption", FloatingLookbackOption())
+    ]
+
+    option_pricer = create_option_pricer(asset_price, sigma, r, opts.seed)
+
+    results = []
+    results += benchmark_path_generation(option_pricer, list_of_simulations, list_of_steps, opts.repeats)
+    results += benchmark_payoffs(option_pricer, options, list_of_simulations, list_of_steps, opts.repeats)
+    results += benchmark_sampling(option_pricer, list_of_simulations, list_of_steps, opts.sample_interval,
+                                  opts.repeats)
+    if not opts.skip_simulation:
+        results += benchmark_simulation_run(option_pricer, options, list_of_simulations, list_of_steps, opts.runs,
+                                            opts.sample_interval, opts.plots)
+    results += benchmark_error_vs_time(option_pricer, asset_price, sigma, r, list_of_simulations,
+                                       max(list_of_steps))
+    results += benchmark_greeks(asset_price, sigma, r, opts.seed, max(list_of_simulations), max(list_of_steps))
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results
+    }
+    with open(opts.output, "w") as outfile:
+        json.dump(report, outfile, indent=2)
+    print("Results written to " + opts.output)
@@ -0,0 +1,29 @@
+from option_types import OptionType
+import numpy as np
+
+
+class BestOfOption:
+    """ Best-of Call or Put Option on the highest of several asset prices """
+
+    path_dependent = False
+
+    def __init__(self, strike, option_type=OptionType.CALL):
+        self.strike = strike
+        self.option_type = option_type
+
+    def payoff(self, asset_prices):
+        best_asset_price = max(asset_prices)
+        if self.option_type == OptionType.CALL:
+            return max(best_asset_price - self.strike, 0)
+        elif self.option_type == OptionType.PUT:
+            return max(self.strike - best_asset_price, 0)
+        return 0
+
+    def payoff_from_paths(self, paths):
+        """ Vectorized payoff for an (assets x simulations x steps+1) array of asset price paths. """
+        best_asset_prices = paths[:, :, -1].max(axis=0)
+        if self.option_type == OptionType.CALL:
+            return np.maximum(best_asset_prices - self.strike, 0)
+        elif self.option_type == OptionType.PUT:
+            return np.maximum(self.strike - best_asset_prices, 0)
+        return np.zeros(paths.shape[1])
@@ -1,4 +1,5 @@
 from option_types import OptionType
+from option import vanilla_control_variate
 import numpy as np
 from scipy.stats import norm
 
@@ -6,6 +7,8 @@ from scipy.stats import norm
 class BinaryOption:
     """ Binary Option """
 
+    path_dependent = False
+
     def __init__(self, strike, payoff, option_type=OptionType.CALL):
         self.strike = strike
         self.payoff_value = payoff
@@ -24,7 +27,20 @@ class BinaryOption:
         last_asset_price = series.iloc[-1]
         return self.payoff(last_asset_price)
 
-    def black_scholes_price(self, asset_price, sigma, r, time_to_maturity=1, D=0):
+    def payoff_from_paths(self, paths):
+        """ Vectorized payoff for an array of asset price paths (one path per row). """
+        last_asset_prices = paths[:, -1]
+        if self.option_type == OptionType.CALL:
+            return np.where(last_asset_prices > self.strike, self.payoff_value, 0)
+        elif self.option_type == OptionType.PUT:
+            return np.where(last_asset_prices < self.strike, self.payoff_value, 0)
+        return np.zeros(len(paths))
+
+    def control_variate(self, paths, times, asset_price, sigma, mu):
+        """ Control variate: the plain vanilla option with the same strike (see vanilla_control_variate). """
+        return vanilla_control_variate(self.strike, self.option_type, paths, times, asset_price, sigma, mu)
+
+    def black_scholes_price(self, asset_price, sigma, r, time_to_maturity=1, D=0, strike=None):
         """ Calculates value of option according to Black-Scholes-Formula.
 
         Arguments:
@@ -33,9 +49,15 @@ class BinaryOption:
             r: the risk-free interest rate
             time_to_maturity: time to maturity in years
             D: cumulative dividends of underlying asset payed until maturity of the option
+            strike: strike of the option (Default: strike of this option)
+
+        All numeric arguments may be NumPy arrays, which are broadcast against each other to price a whole
+        grid of contracts in one call.
         """
 
-        d2 = (np.log(asset_price / self.strike) + (r - D - 1 / 2 * sigma ** 2) * time_to_maturity) / \
+        asset_price = np.asarray(asset_price, dtype=float)
+        strike = np.asarray(self.strike if strike is None else strike, dtype=float)
+        d2 = (np.log(asset_price / strike) + (r - D - 1 / 2 * sigma ** 2) * time_to_maturity) / \
                 (sigma * np.sqrt(time_to_maturity))
         if self.option_type == OptionType.CALL:
             return np.exp(-r*time_to_maturity)*norm.cdf(d2)*self.payoff_value
@@ -0,0 +1,168 @@
+from option_shortcuts import reference_price
+from scipy.optimize import minimize
+import numpy as np
+import copy
+import math
+import time
+
+
+class CalibrationResult:
+    def __init__(self):
+        self.parameters = None
+        self.model_prices = None
+        self.objective = None
+        self.rmse = None
+        self.iterations = None
+        self.evaluations = None
+        self.wall_time = None
+        self.success = None
+        self.message = None
+
+
+class Calibration:
+    """ Fits model parameters of an OptionPricer to market prices of options
+
+    The objective is the weighted sum of squared differences of model and market prices. Instruments with a
+    closed-form price in the model are priced in closed form: black_scholes_price of the option for the
+    geometric Brownian motion, Merton's series for a MertonJumpModel and options on the terminal asset price.
+    All other instruments are priced by Monte Carlo with common random numbers: the shocks are drawn once,
+    and every evaluation of the objective builds one set of paths from them, up to the longest maturity,
+    and prices all instruments from it. The objective is then a deterministic, smooth function of the
+    parameters, which a gradient based optimizer can minimize.
+
+    Prices are risk-neutral if mu of the pricer equals the risk-free rate.
+    """
+
+    def __init__(self, option_pricer, instruments, parameters, simulations=10000, steps_per_year=50, weights=None):
+        """ Arguments:
+            option_pricer: the pricer with the model (and initial parameter values) to calibrate
+            instruments: list of (option, time_to_maturity, market_price)
+            parameters: list of (name, lower bound, upper bound) of the parameters to fit. A name is looked
+                up as attribute of the model of the pricer first (e.g. "kappa" of a HestonModel) and is set
+                with the set_<name> method of the pricer otherwise (e.g. "sigma").
+            simulations: number of Monte Carlo paths
+            steps_per_year: number of steps per year of the Monte Carlo paths
+            weights: weights of the squared price differences of the instruments (Default: 1)
+        """
+
+        self.option_pricer = option_pricer
+        self.instruments = instruments
+        self.parameters = parameters
+        self.simulations = simulations
+        self.steps_per_year = steps_per_year
+        self.weights = np.ones(len(instruments)) if weights is None else np.asarray(weights, dtype=float)
+        self.market_prices = np.array([market_price for (_, _, market_price) in instruments], dtype=float)
+        self.evaluations = 0
+
+        # Evaluations work on a copy, so the pricer and its model only change once the fit is done
+        self.pricer = option_pricer.clone(option_pricer.seed)
+        if option_pricer.model is not None:
+            self.pricer.set_model(copy.copy(option_pricer.model))
+
+        self.closed_form = np.array([self.has_closed_form(option) for (option, _, _) in instruments], dtype=bool)
+        self.shocks = None
+        self.positions = None
+        if not self.closed_form.all():
+            self.draw_shocks()
+
+    def has_closed_form(self, option):
+        model = self.pricer.model
+        if not hasattr(option, "black_scholes_price"):
+            return False
+        if model is None:
+            return True
+        return hasattr(model, "black_scholes_price") and not getattr(option, "path_dependent", True)
+
+    def closed_form_price(self, option, time_to_maturity):
+        pricer = self.pricer
+        if pricer.model is None:
+            return reference_price(option, pricer.init_asset_price, pricer.sigma, pricer.risk_free_rate,
+                                   time_to_maturity)
+        return pricer.model.black_scholes_price(option, pricer.init_asset_price, pricer.sigma,
+                                                pricer.risk_free_rate, time_to_maturity)
+
+    def draw_shocks(self):
+        """ Draws the common random numbers of all evaluations, for paths up to the longest maturity of
+            the instruments priced by Monte Carlo. """
+
+        pricer = self.pricer
+        maturities = [time_to_maturity for ((_, time_to_maturity, _), closed_form)
+                      in zip(self.instruments, self.closed_form) if not closed_form]
+        longest_maturity = max(maturities)
+        steps = max(1, int(math.ceil(self.steps_per_year * longest_maturity)))
+        pricer.set_maturity(pricer.start_time + longest_maturity)
+        # Grid positions of the maturities of all instruments
+        self.positions = [int(round(time_to_maturity / longest_maturity * steps))
+                          for (_, time_to_maturity, _) in self.instruments]
+        if pricer.model is not None:
+            self.shocks = pricer.model.draw_shocks(pricer, self.simulations, steps)
+        else:
+            self.shocks = pricer.draw_normals(self.simulations, steps)
+
+    def set_parameters(self, option_pricer, values):
+        for ((name, _, _), value) in zip(self.parameters, values):
+            value = float(value)
+            if option_pricer.model is not None and hasattr(option_pricer.model, name):
+                setattr(option_pricer.model, name, value)
+            else:
+                getattr(option_pricer, "set_" + name)(value)
+
+    def parameter_values(self, option_pricer):
+        values = []
+        for (name, _, _) in self.parameters:
+            if option_pricer.model is not None and hasattr(option_pricer.model, name):
+                values.append(getattr(option_pricer.model, name))
+            else:
+                values.append(getattr(option_pricer, name))
+        return np.array(values, dtype=float)
+
+    def model_prices(self, values):
+        """ Returns the prices of all instruments for the parameter values. """
+
+        pricer = self.pricer
+        self.set_parameters(pricer, values)
+        prices = np.empty(len(self.instruments))
+
+        paths = None
+        if self.shocks is not None:
+            if pricer.model is not None:
+                paths = pricer.model.paths_from_shocks(pricer, self.shocks)
+            else:
+                paths = pricer.paths_from_normals(self.shocks)
+
+        for (i, (option, time_to_maturity, _)) in enumerate(self.instruments):
+            if self.closed_form[i]:
+                prices[i] = self.closed_form_price(option, time_to_maturity)
+            else:
+                payoffs = pricer.payoffs_from_paths(option, paths[:, :self.positions[i] + 1])
+                prices[i] = pricer.discount(payoffs.mean(), time_to_maturity)
+        return prices
+
+    def objective(self, values):
+        self.evaluations += 1
+        return np.sum(self.weights * (self.model_prices(values) - self.market_prices) ** 2)
+
+    def calibrate(self, method="L-BFGS-B", tolerance=None, max_iterations=None):
+        """ Minimizes the objective with scipy.optimize.minimize, starting from the current parameter
+            values of the pricer, and sets the fitted parameters on the pricer (and its model). Returns a
+            CalibrationResult. """
+
+        start = time.perf_counter()
+        self.evaluations = 0
+        options = {} if max_iterations is None else {"maxiter": max_iterations}
+        bounds = [(lower, upper) for (_, lower, upper) in self.parameters]
+        optimum = minimize(self.objective, self.parameter_values(self.option_pricer), method=method,
+                           bounds=bounds, tol=tolerance, options=options)
+        self.set_parameters(self.option_pricer, optimum.x)
+
+        result = CalibrationResult()
+        result.parameters = {name: value for ((name, _, _), value) in zip(self.parameters, optimum.x.tolist())}
+        result.model_prices = self.model_prices(optimum.x)
+        result.objective = optimum.fun
+        result.rmse = np.sqrt(np.mean((result.model_prices - self.market_prices) ** 2))
+        result.iterations = getattr(optimum, "nit", None)
+        result.evaluations = self.evaluations
+        result.wall_time = time.perf_counter() - start
+        result.success = optimum.success
+        result.message = optimum.message
+        return result
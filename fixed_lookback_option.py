@@ -1,11 +1,15 @@
 from option_types import OptionType
+from option import vanilla_control_variate
 from numpy import log, exp, sqrt
+import numpy as np
 from scipy.stats import norm
 
 
 class FixedLookbackOption:
     """ Fixed Lookback Option """
 
+    path_dependent = True
+
     def __init__(self, strike, option_type=OptionType.CALL):
         self.strike = strike
         self.option_type = option_type
@@ -22,7 +26,39 @@ class FixedLookbackOption:
         min_asset_price = series.min()
         return self.payoff(min_asset_price, max_asset_price)
 
-    def black_scholes_price(self, asset_price, asset_min, asset_max, sigma, r, time_to_maturity=1, D=0):
+    def payoff_from_paths(self, paths, history=None):
+        """ Vectorized payoff for an array of asset price paths (one path per row). The observations of
+            history (a PathHistory of a trade in progress) are taken into account if given. """
+        if self.option_type == OptionType.CALL:
+            max_asset_prices = paths.max(axis=1)
+            if history is not None:
+                max_asset_prices = np.maximum(max_asset_prices, history.maximum)
+            return np.maximum(max_asset_prices - self.strike, 0)
+        elif self.option_type == OptionType.PUT:
+            min_asset_prices = paths.min(axis=1)
+            if history is not None:
+                min_asset_prices = np.minimum(min_asset_prices, history.minimum)
+            return np.maximum(self.strike - min_asset_prices, 0)
+        return np.zeros(len(paths))
+
+    def payoff_gradient_from_paths(self, paths, history=None):
+        """ Derivative of the payoff with respect to every asset price of paths, for pathwise Greeks. """
+        gradient = np.zeros(paths.shape)
+        rows = np.arange(len(paths))
+        if self.option_type == OptionType.CALL:
+            # Only a new maximum above the strike moves the payoff
+            threshold = self.strike if history is None else max(self.strike, history.maximum)
+            gradient[rows, paths.argmax(axis=1)] = paths.max(axis=1) > threshold
+        elif self.option_type == OptionType.PUT:
+            threshold = self.strike if history is None else min(self.strike, history.minimum)
+            gradient[rows, paths.argmin(axis=1)] = np.where(paths.min(axis=1) < threshold, -1.0, 0.0)
+        return gradient
+
+    def control_variate(self, paths, times, asset_price, sigma, mu):
+        """ Control variate: the plain vanilla option with the same strike (see vanilla_control_variate). """
+        return vanilla_control_variate(self.strike, self.option_type, paths, times, asset_price, sigma, mu)
+
+    def black_scholes_price(self, asset_price, asset_min, asset_max, sigma, r, time_to_maturity=1, D=0, strike=None):
         """ Calculates value of option according to Black-Scholes-Formula.
 
         Arguments:
@@ -33,63 +69,48 @@ class FixedLookbackOption:
             r: the risk-free interest rate
             time_to_maturity: time to maturity in years
             D: cumulative dividends of underlying asset payed until maturity of the option
+            strike: strike of the option (Default: strike of this option)
+
+        All numeric arguments may be NumPy arrays, which are broadcast against each other to price a whole
+        grid of contracts in one call.
         """
 
-        S = asset_price
-        E = self.strike
+        S = np.asarray(asset_price, dtype=float)
+        E = np.asarray(self.strike if strike is None else strike, dtype=float)
         t = time_to_maturity
         b = r - D
 
         if self.option_type == OptionType.CALL:
             M = asset_max
-            if E > M:
-                d1 = (log(S / E) + (r - D + 1 / 2 * (sigma ** 2)) * t) / \
-                     (sigma * sqrt(t))
-                d2 = d1 - sigma * sqrt(t)
-                C = S * exp(-D * t) * norm.cdf(d1) - \
-                    E * exp(-r * t) * norm.cdf(d2) + \
-                    S * exp(-r * t) * (sigma ** 2) / (2 * b) * \
-                    (-(S / E) ** -(2 * b / sigma ** 2) *
-                     norm.cdf(d1 - (2 * b * sqrt(t)) / sigma) +
-                     exp(b * t) * norm.cdf(d1))
-                return C
-            else:
-                d1 = (log(S / M) + (r - D + 1 / 2 * (sigma ** 2)) * t) / \
-                     (sigma * sqrt(t))
-                d2 = d1 - sigma * sqrt(t)
-                C = (M - E) * exp(-r * t) + \
-                    S * exp(-D * t) * norm.cdf(d1) - \
-                    M * exp(-r * t) * norm.cdf(d2) + \
-                    S * exp(-r * t) * (sigma ** 2) / (2 * b) * \
-                    (-(S / M) ** -(2 * b / sigma ** 2) *
-                     norm.cdf(d1 - (2 * b * sqrt(t)) / sigma) +
-                     exp(b * t) * norm.cdf(d1))
-                return C
+            # For E > M the formula is the one of E, otherwise the one of M plus the payoff (M - E) already
+            # locked in. X selects the level per contract, which replaces the branch on E > M.
+            X = np.maximum(E, M)
+            d1 = (log(S / X) + (r - D + 1 / 2 * (sigma ** 2)) * t) / \
+                 (sigma * sqrt(t))
+            d2 = d1 - sigma * sqrt(t)
+            C = np.maximum(M - E, 0) * exp(-r * t) + \
+                S * exp(-D * t) * norm.cdf(d1) - \
+                X * exp(-r * t) * norm.cdf(d2) + \
+                S * exp(-r * t) * (sigma ** 2) / (2 * b) * \
+                (-(S / X) ** -(2 * b / sigma ** 2) *
+                 norm.cdf(d1 - (2 * b * sqrt(t)) / sigma) +
+                 exp(b * t) * norm.cdf(d1))
+            return C
 
         elif self.option_type == OptionType.PUT:
             M = asset_min
-            if E < M:
-                d1 = (log(S / E) + (b + 1 / 2 * (sigma ** 2)) * t) / \
-                     (sigma * sqrt(t))
-                d2 = d1 - sigma * sqrt(t)
-                P = E * exp(-r * t) * norm.cdf(-d2) - \
-                    S * exp(-D * t) * norm.cdf(-d1) + \
-                    S * exp(-r * t) * (sigma ** 2) / (2 * b) * \
-                    ((S / E) ** -(2 * b / (sigma ** 2)) *
-                     norm.cdf(-d1 + (2 * b * sqrt(t)) / sigma) -
-                     exp(b * t) * norm.cdf(-d1))
-                return 333
-            else:
-                d1 = (log(S / M) + (b + 1 / 2 * (sigma ** 2)) * t) / \
-                     (sigma * sqrt(t))
-                d2 = d1 - sigma * sqrt(t)
-                P = (E - M) * exp(-r * t) - \
-                    S * exp(-D * t) * norm.cdf(-d1) + \
-                    M * exp(-r * t) * norm.cdf(-d2) + \
-                    S * exp(-r * t) * (sigma ** 2) / (2 * b) * \
-                    ((S / M) ** -(2 * b / (sigma ** 2)) *
-                     norm.cdf(-d1 + (2 * b * sqrt(t)) / sigma) -
-                     exp(b * t) * norm.cdf(-d1))
-                return P
+            # For E < M the formula is the one of E, otherwise the one of M plus the payoff (E - M) already
+            # locked in.
+            X = np.minimum(E, M)
+            d1 = (log(S / X) + (b + 1 / 2 * (sigma ** 2)) * t) / \
+                 (sigma * sqrt(t))
+            d2 = d1 - sigma * sqrt(t)
+            P = np.maximum(E - M, 0) * exp(-r * t) - \
+                S * exp(-D * t) * norm.cdf(-d1) + \
+                X * exp(-r * t) * norm.cdf(-d2) + \
+                S * exp(-r * t) * (sigma ** 2) / (2 * b) * \
+                ((S / X) ** -(2 * b / (sigma ** 2)) *
+                 norm.cdf(-d1 + (2 * b * sqrt(t)) / sigma) -
+                 exp(b * t) * norm.cdf(-d1))
+            return P
         return 0
-
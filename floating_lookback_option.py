@@ -1,11 +1,15 @@
 from option_types import OptionType
+from option import terminal_control_variate
 from numpy import log, exp, sqrt
+import numpy as np
 from scipy.stats import norm
 
 
 class FloatingLookbackOption:
     """ Floating Lookback Option """
 
+    path_dependent = True
+
     def __init__(self, option_type=OptionType.CALL):
         self.option_type = option_type
 
@@ -22,6 +26,40 @@ class FloatingLookbackOption:
         max_asset_price = series.max()
         return self.payoff(last_asset_price, min_asset_price, max_asset_price)
 
+    def payoff_from_paths(self, paths, history=None):
+        """ Vectorized payoff for an array of asset price paths (one path per row). The observations of
+            history (a PathHistory of a trade in progress) are taken into account if given. """
+        if self.option_type == OptionType.CALL:
+            min_asset_prices = paths.min(axis=1)
+            if history is not None:
+                min_asset_prices = np.minimum(min_asset_prices, history.minimum)
+            return paths[:, -1] - min_asset_prices
+        elif self.option_type == OptionType.PUT:
+            max_asset_prices = paths.max(axis=1)
+            if history is not None:
+                max_asset_prices = np.maximum(max_asset_prices, history.maximum)
+            return max_asset_prices - paths[:, -1]
+        return np.zeros(len(paths))
+
+    def payoff_gradient_from_paths(self, paths, history=None):
+        """ Derivative of the payoff with respect to every asset price of paths, for pathwise Greeks. """
+        gradient = np.zeros(paths.shape)
+        rows = np.arange(len(paths))
+        if self.option_type == OptionType.CALL:
+            gradient[:, -1] += 1
+            # An observed minimum below the simulated ones does not move
+            new_minimum = 1.0 if history is None else paths.min(axis=1) < history.minimum
+            gradient[rows, paths.argmin(axis=1)] -= new_minimum
+        elif self.option_type == OptionType.PUT:
+            new_maximum = 1.0 if history is None else paths.max(axis=1) > history.maximum
+            gradient[rows, paths.argmax(axis=1)] += new_maximum
+            gradient[:, -1] -= 1
+        return gradient
+
+    def control_variate(self, paths, times, asset_price, sigma, mu):
+        """ Control variate: the terminal asset price (see terminal_control_variate). """
+        return terminal_control_variate(paths, times, asset_price, mu)
+
     def black_scholes_price_2(self, asset_price, asset_min, asset_max, sigma, r, time_to_maturity=1, D=0):
         """ Calculates value of option according to Black-Scholes-Formula.
             Formula from PWOQF Vol 2, p. 450
@@ -34,10 +72,13 @@ class FloatingLookbackOption:
             r: the risk-free interest rate
             time_to_maturity: time to maturity in years
             D: cumulative dividends of underlying asset payed until maturity of the option
+
+        All numeric arguments may be NumPy arrays, which are broadcast against each other to price a whole
+        grid of contracts in one call.
         """
 
         t = time_to_maturity
-        S = asset_price
+        S = np.asarray(asset_price, dtype=float)
 
         if self.option_type == OptionType.CALL:
             M = asset_min
@@ -73,11 +114,14 @@ class FloatingLookbackOption:
             r: the risk-free interest rate
             time_to_maturity: time to maturity in years
             D: cumulative dividends of underlying asset payed until maturity of the option
+
+        All numeric arguments may be NumPy arrays, which are broadcast against each other to price a whole
+        grid of contracts in one call.
         """
 
         r1 = (r + 1 / 2 * sigma ** 2)
         t = time_to_maturity
-        S = asset_price
+        S = np.asarray(asset_price, dtype=float)
         d = r1 * sqrt(t) / sigma
         if self.option_type == OptionType.CALL:
             return S * (norm.cdf(d) - exp(-r * t) * norm.cdf(d - sigma * sqrt(t)) - sigma ** 2 / (2 * r) *
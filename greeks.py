@@ -0,0 +1,118 @@
+import numpy as np
+
+
+class Greeks:
+    def __init__(self):
+        self.price = None
+        self.delta = None
+        self.gamma = None
+        self.vega = None
+        self.rho = None
+        self.method = None
+
+
+class GreeksCalculator:
+    """ Monte Carlo Greeks from the paths of an OptionPricer
+
+    Price, delta, gamma, vega and rho are all estimated from the paths of the last call of
+    run_monte_carlo_simulations, so no bump-and-revalue simulations are needed.
+
+    Options providing payoff_gradient_from_paths (continuous payoffs) use pathwise estimators for delta,
+    vega and rho. Gamma is a mixed pathwise/likelihood-ratio estimator for payoffs of the terminal asset
+    price. The payoffs of path-dependent options also read the initial asset price itself (the first column
+    of the paths, e.g. in an average or a minimum), which the likelihood ratio of the first step misses; their
+    gamma is the central difference of the pathwise delta with common random numbers: the paths are
+    proportional to S0, so the bumped paths are the rescaled paths. All other options (e.g. the
+    discontinuous binary and barrier payoffs) use likelihood-ratio estimators, whose weights only depend on
+    the normal shocks of the paths.
+
+    The estimators require the EXACT scheme of the geometric Brownian motion and assume risk-neutral paths
+    (mu equal to the risk-free rate): rho shifts both drift and discount rate.
+    """
+
+    PATHWISE = "pathwise"
+    LIKELIHOOD_RATIO = "likelihood ratio"
+    # Relative bump of S0 for the central difference gamma of path-dependent options
+    GAMMA_BUMP = 0.01
+
+    def __init__(self, option_pricer):
+        self.option_pricer = option_pricer
+
+    def calculate(self, option, time_to_maturity=None, sample_distance=None):
+        """ Calculates price and Greeks of option.
+
+        Arguments:
+            option: the option to calculate the Greeks for
+            time_to_maturity: time to maturity used for discounting (Default: maturity - start_time)
+            sample_distance: sample distance for discrete sampling (Default: continuous sampling)
+        """
+
+        pricer = self.option_pricer
+        if pricer.scheme != pricer.EXACT or pricer.model is not None:
+            raise ValueError("Monte Carlo Greeks require the EXACT scheme of the geometric Brownian motion")
+
+        paths = pricer.paths
+        time_grid = pricer.time_grid
+        asset_price = pricer.init_asset_price
+        sigma = pricer.sigma
+        steps = paths.shape[1] - 1
+        dt = (pricer.maturity - pricer.start_time) / steps
+        if time_to_maturity is None:
+            time_to_maturity = pricer.maturity - pricer.start_time
+        discount = np.exp(-pricer.risk_free_rate * time_to_maturity)
+
+        # Recover the normal shocks and the Brownian motion from the paths
+        normals = (np.diff(np.log(paths), axis=1) - (pricer.mu - sigma ** 2 / 2) * dt) / (sigma * np.sqrt(dt))
+        brownian = np.zeros(paths.shape)
+        np.cumsum(normals * np.sqrt(dt), axis=1, out=brownian[:, 1:])
+
+        sampled_paths = pricer.sample_paths(paths, time_grid, sample_distance)
+        sample_times = pricer.sample_times(time_grid, sample_distance)
+        payoffs = discount * pricer.payoffs_from_paths(option, sampled_paths)
+
+        # Likelihood ratio weight of the initial asset price, which only enters the first step
+        first_normals = normals[:, 0]
+        delta_weights = first_normals / (asset_price * sigma * np.sqrt(dt))
+
+        greeks = Greeks()
+        greeks.price = payoffs.mean()
+        if hasattr(option, "payoff_gradient_from_paths"):
+            sampled_brownian = pricer.sample_paths(brownian, time_grid, sample_distance)
+            gradient = discount * self.payoff_gradient(option, sampled_paths)
+            # Derivatives of the asset prices with respect to S0, sigma and r
+            delta_terms = (gradient * sampled_paths).sum(axis=1)
+            greeks.delta = delta_terms.mean() / asset_price
+            if getattr(option, "path_dependent", True):
+                bump = GreeksCalculator.GAMMA_BUMP
+                greeks.gamma = (self.pathwise_delta(option, sampled_paths * (1 + bump), discount) -
+                                self.pathwise_delta(option, sampled_paths * (1 - bump), discount)) / \
+                    (2 * bump * asset_price)
+            else:
+                greeks.gamma = ((delta_terms * first_normals / (sigma * np.sqrt(dt))).mean() -
+                                delta_terms.mean()) / asset_price ** 2
+            greeks.vega = (gradient * sampled_paths * (sampled_brownian - sigma * sample_times)).sum(axis=1).mean()
+            greeks.rho = (gradient * sampled_paths * sample_times).sum(axis=1).mean() - \
+                time_to_maturity * greeks.price
+            greeks.method = GreeksCalculator.PATHWISE
+        else:
+            gamma_weights = (first_normals ** 2 - 1) / (asset_price ** 2 * sigma ** 2 * dt) - \
+                first_normals / (asset_price ** 2 * sigma * np.sqrt(dt))
+            vega_weights = ((normals ** 2 - 1) / sigma - normals * np.sqrt(dt)).sum(axis=1)
+            rho_weights = normals.sum(axis=1) * np.sqrt(dt) / sigma
+            greeks.delta = (payoffs * delta_weights).mean()
+            greeks.gamma = (payoffs * gamma_weights).mean()
+            greeks.vega = (payoffs * vega_weights).mean()
+            greeks.rho = (payoffs * rho_weights).mean() - time_to_maturity * greeks.price
+            greeks.method = GreeksCalculator.LIKELIHOOD_RATIO
+        return greeks
+
+    def payoff_gradient(self, option, sampled_paths):
+        history = self.option_pricer.history
+        if history is not None and getattr(option, "path_dependent", True):
+            return option.payoff_gradient_from_paths(sampled_paths, history)
+        return option.payoff_gradient_from_paths(sampled_paths)
+
+    def pathwise_delta(self, option, sampled_paths, discount):
+        """ Pathwise delta of option for paths starting at sampled_paths[:, 0]. """
+        gradient = self.payoff_gradient(option, sampled_paths)
+        return discount * (gradient * sampled_paths).sum(axis=1).mean() / sampled_paths[0, 0]
@@ -0,0 +1,62 @@
+import numpy as np
+
+
+class HestonModel:
+    """ Heston stochastic volatility model
+
+    Model of the asset price:
+        dS = mu*S*dt + sqrt(v)*S*dX1
+        dv = kappa*(theta - v)*dt + xi*sqrt(v)*dX2,  dX1*dX2 = rho*dt
+
+    Paths are built with the full truncation scheme (Lord et al.): the variance process is stepped with
+    Euler where negative variances are replaced by 0 in drift and diffusion, the asset price is stepped in
+    logs. The steps are sequential, each step is vectorized across all paths.
+    """
+
+    # Steps are not exact, so path independent options need a fine grid as well
+    exact = False
+
+    def __init__(self, v0, kappa, theta, xi, rho):
+        """ Arguments:
+            v0: initial variance
+            kappa: speed of mean reversion of the variance
+            theta: long-term variance
+            xi: volatility of the variance
+            rho: correlation of the Brownian motions of asset price and variance
+        """
+
+        self.v0 = v0
+        self.kappa = kappa
+        self.theta = theta
+        self.xi = xi
+        self.rho = rho
+
+    def draw_shocks(self, option_pricer, simulations, steps):
+        """ Draws the independent standard normal shocks of asset price and variance with the random
+            number generator (and antithetic or Sobol settings) of option_pricer. """
+
+        return (option_pricer.draw_normals(simulations, steps), option_pricer.draw_normals(simulations, steps))
+
+    def paths_from_shocks(self, option_pricer, shocks):
+        """ Builds the (simulations x steps+1) array of asset price paths from shocks of draw_shocks.
+            The same shocks give the same paths for any model parameters (common random numbers). """
+
+        (asset_normals, variance_normals) = shocks
+        (simulations, steps) = asset_normals.shape
+        dt = (option_pricer.maturity - option_pricer.start_time) / steps
+        mu = option_pricer.mu
+
+        paths = np.empty((simulations, steps + 1))
+        paths[:, 0] = 0
+        variance = np.full(simulations, float(self.v0))
+        correlated_normals = np.sqrt(1 - self.rho ** 2) * variance_normals + self.rho * asset_normals
+        for step in range(steps):
+            truncated_variance = np.maximum(variance, 0)
+            volatility = np.sqrt(truncated_variance * dt)
+            paths[:, step + 1] = paths[:, step] + (mu - truncated_variance / 2) * dt + \
+                volatility * asset_normals[:, step]
+            variance += self.kappa * (self.theta - truncated_variance) * dt + \
+                self.xi * volatility * correlated_normals[:, step]
+        np.exp(paths, out=paths)
+        paths *= option_pricer.init_asset_price
+        return paths
@@ -0,0 +1,129 @@
+import cProfile
+import tracemalloc
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+
+class Phase:
+    """ Context manager timing one execution of a phase """
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.instrumentation.add_timing(self.name, time.perf_counter() - self.start)
+
+
+class NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+class NullInstrumentation:
+    """ Instrumentation that records nothing. It is the default of OptionPricer, so the hooks in the hot
+        paths only cost a method call when instrumentation is disabled. """
+
+    enabled = False
+    NULL_PHASE = NullPhase()
+
+    def phase(self, name):
+        return NullInstrumentation.NULL_PHASE
+
+    def count(self, name, value=1):
+        pass
+
+
+class Instrumentation:
+    """ Opt-in instrumentation of OptionPricer and Simulation
+
+    Records the wall time per phase (rng, path_construction, sampling, payoff_evaluation, reduction,
+    csv_write, plot_rendering), counters (paths, steps, random_numbers) and memory high-water marks, and
+    can profile with cProfile. With a ParallelExecutor, the timings and counters recorded in the worker
+    processes are merged into the instrumentation of the calling process; memory high-water marks are the
+    ones of the calling process, and profiling needs a single worker.
+    """
+
+    enabled = True
+
+    def __init__(self, trace_memory=False):
+        """ Arguments:
+            trace_memory: trace Python and NumPy allocations with tracemalloc for an exact peak of the
+                allocated memory (slows down allocations). The maximum resident set size of the process is
+                recorded in any case, where the platform supports it.
+        """
+
+        self.timings = {}
+        self.calls = {}
+        self.counters = {}
+        self.trace_memory = trace_memory
+        self.profiler = None
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def phase(self, name):
+        return Phase(self, name)
+
+    def add_timing(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, other):
+        """ Adds the timings and counters recorded by other, e.g. in a worker process. """
+        for (name, seconds) in other.timings.items():
+            self.timings[name] = self.timings.get(name, 0) + seconds
+            self.calls[name] = self.calls.get(name, 0) + other.calls[name]
+        for (name, value) in other.counters.items():
+            self.count(name, value)
+
+    def start_profiling(self):
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def stop_profiling(self, filename=None):
+        """ Stops profiling and dumps the statistics to filename (readable with pstats) if given. """
+        self.profiler.disable()
+        if filename is not None:
+            self.profiler.dump_stats(filename)
+
+    def memory(self):
+        memory = {}
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux
+            memory["max_resident_set_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        if self.trace_memory and tracemalloc.is_tracing():
+            (current, peak) = tracemalloc.get_traced_memory()
+            memory["traced_current_bytes"] = current
+            memory["traced_peak_bytes"] = peak
+        return memory
+
+    def report(self):
+        """ Returns the recorded timings, counters and memory high-water marks as a dictionary. """
+        return {
+            "phases": {name: {"seconds": self.timings[name], "calls": self.calls[name]} for name in self.timings},
+            "counters": dict(self.counters),
+            "memory": self.memory()
+        }
+
+    def reset(self):
+        self.timings = {}
+        self.calls = {}
+        self.counters = {}
+        if self.trace_memory and tracemalloc.is_tracing() and hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
@@ -0,0 +1,86 @@
+from option_pricer import PricingResult
+from numpy.polynomial import laguerre, polynomial
+import numpy as np
+
+
+class LongstaffSchwartz:
+    """ Least-squares Monte Carlo pricer for early-exercise (American and Bermudan) options
+
+    Works on the paths of the last call of run_monte_carlo_simulations of an OptionPricer. Going backwards
+    through the exercise dates, the discounted future cash flows of the in-the-money paths are regressed on
+    basis functions of the asset price (one np.linalg.lstsq call per exercise date). A path is exercised
+    where the immediate payoff exceeds the estimated continuation value.
+
+    Any option with a vectorized payoff_from_paths depending on the terminal asset price only (Option,
+    BinaryOption) can be priced; the payoff of a one-column slice of the paths is the exercise value at
+    that date.
+    """
+
+    (POLYNOMIAL, LAGUERRE) = range(2)
+
+    def __init__(self, option_pricer, basis=POLYNOMIAL, degree=3):
+        """ Arguments:
+            option_pricer: the pricer holding the simulated paths
+            basis: POLYNOMIAL, LAGUERRE or a function mapping an array of (normalised) asset prices to the
+                matrix of basis function values, one column per basis function
+            degree: degree of the polynomial or Laguerre basis
+        """
+
+        self.option_pricer = option_pricer
+        self.basis = basis
+        self.degree = degree
+
+    def basis_functions(self, x):
+        if callable(self.basis):
+            return self.basis(x)
+        if self.basis == LongstaffSchwartz.LAGUERRE:
+            return laguerre.lagvander(x, self.degree) * np.exp(-x / 2)[:, None]
+        return polynomial.polyvander(x, self.degree)
+
+    def exercise_positions(self, exercise_times):
+        """ Positions of the exercise dates within the time grid. Exercise times are snapped to the
+            nearest grid point; without exercise times every grid point is an exercise date (American). """
+
+        time_grid = self.option_pricer.time_grid
+        if exercise_times is None:
+            return np.arange(len(time_grid))
+        exercise_times = np.asarray(exercise_times, dtype=float)
+        positions = np.abs(time_grid[None, :] - exercise_times[:, None]).argmin(axis=1)
+        return np.unique(np.append(positions, len(time_grid) - 1))
+
+    def price(self, option, exercise_times=None):
+        """ Prices option with early exercise at exercise_times (Default: every point of the time grid).
+            Maturity is always an exercise date. Returns a PricingResult. """
+
+        pricer = self.option_pricer
+        paths = pricer.paths
+        time_grid = pricer.time_grid
+        r = pricer.risk_free_rate
+        scale = getattr(option, "strike", pricer.init_asset_price)
+        positions = self.exercise_positions(exercise_times)
+
+        # Cash flows of each path, discounted to the exercise date currently processed
+        values = option.payoff_from_paths(paths[:, -1:]).astype(float)
+        for (position, next_position) in zip(positions[-2::-1], positions[:0:-1]):
+            values *= np.exp(-r * (time_grid[next_position] - time_grid[position]))
+            if position == 0:
+                continue
+            exercise_values = option.payoff_from_paths(paths[:, position:position + 1])
+            in_the_money = np.flatnonzero(exercise_values > 0)
+            if len(in_the_money) == 0:
+                continue
+            basis = self.basis_functions(paths[in_the_money, position] / scale)
+            (coefficients, _, _, _) = np.linalg.lstsq(basis, values[in_the_money], rcond=None)
+            exercise = exercise_values[in_the_money] > basis @ coefficients
+            values[in_the_money[exercise]] = exercise_values[in_the_money[exercise]]
+
+        values *= np.exp(-r * (time_grid[positions[0]] - time_grid[0]))
+
+        result = PricingResult()
+        result.price = values.mean()
+        result.standard_error = values.std(ddof=1) / np.sqrt(len(values))
+        result.paths = len(values)
+        if positions[0] == 0:
+            # Immediate exercise
+            result.price = max(result.price, option.payoff_from_paths(paths[:1, :1])[0])
+        return result
@@ -0,0 +1,98 @@
+from scipy.stats import poisson
+import numpy as np
+import math
+
+
+class MertonJumpModel:
+    """ Merton jump-diffusion model
+
+    Model of the asset price:
+        dS = (mu - lam*k)*S*dt + sigma*S*dX + (J - 1)*S*dN,  k = E[J - 1] = exp(m + delta^2/2) - 1
+
+    N is a Poisson process with intensity lam and the log jump sizes log(J) are N(m, delta^2). The volatility
+    sigma of the diffusion is the one of the OptionPricer. Paths are stepped exactly in logs: per step the
+    number of jumps of every path is drawn in bulk by inverting the Poisson distribution at uniform random
+    numbers, and the sum of the log jumps is normal given their number. Since the steps are exact, path
+    independent options are priced from a single step.
+    """
+
+    exact = True
+
+    def __init__(self, lam, m, delta):
+        """ Arguments:
+            lam: jump intensity (expected number of jumps per year)
+            m: mean of the log jump sizes
+            delta: standard deviation of the log jump sizes
+        """
+
+        self.lam = lam
+        self.m = m
+        self.delta = delta
+
+    @property
+    def k(self):
+        return np.exp(self.m + self.delta ** 2 / 2) - 1
+
+    def draw_shocks(self, option_pricer, simulations, steps):
+        """ Draws the diffusion and jump size normals and the uniforms of the jump counts with the random
+            number generator of option_pricer. The jump counts are derived from the uniforms in
+            paths_from_shocks, so the same shocks serve any jump intensity (common random numbers). """
+
+        diffusion_normals = option_pricer.draw_normals(simulations, steps)
+        jump_normals = option_pricer.draw_normals(simulations, steps)
+        if option_pricer.antithetic:
+            uniforms = option_pricer.random_state.random(((simulations + 1) // 2, steps))
+            uniforms = np.concatenate((uniforms, 1 - uniforms))
+        else:
+            uniforms = option_pricer.random_state.random((simulations, steps))
+        return (diffusion_normals, jump_normals, uniforms)
+
+    @staticmethod
+    def jump_counts(uniforms, expected_jumps):
+        """ Inverts the Poisson distribution with mean expected_jumps at uniforms. The distribution function
+            is tabulated up to the largest count needed, so the inversion is one np.searchsorted call. """
+
+        max_jumps = max(int(poisson.ppf(uniforms.max(), expected_jumps)), 0)
+        cdf = poisson.cdf(np.arange(max_jumps + 1), expected_jumps)
+        return np.searchsorted(cdf, uniforms).astype(float)
+
+    def paths_from_shocks(self, option_pricer, shocks):
+        """ Builds the (simulations x steps+1) array of asset price paths from shocks of draw_shocks. """
+
+        (diffusion_normals, jump_normals, uniforms) = shocks
+        (simulations, steps) = diffusion_normals.shape
+        dt = (option_pricer.maturity - option_pricer.start_time) / steps
+        sigma = option_pricer.sigma
+
+        jumps = self.jump_counts(uniforms, self.lam * dt)
+        paths = np.empty((simulations, steps + 1))
+        paths[:, 0] = 0
+        log_growth = (option_pricer.mu - self.lam * self.k - sigma ** 2 / 2) * dt + \
+            sigma * np.sqrt(dt) * diffusion_normals + self.m * jumps + self.delta * np.sqrt(jumps) * jump_normals
+        np.cumsum(log_growth, axis=1, out=paths[:, 1:])
+        np.exp(paths, out=paths)
+        paths *= option_pricer.init_asset_price
+        return paths
+
+    def black_scholes_price(self, option, asset_price, sigma, r, time_to_maturity=1, terms=50):
+        """ Calculates value of an option with a payoff depending on the terminal asset price only (Option,
+            BinaryOption) with Merton's series of Black-Scholes prices, conditioned on the number of jumps.
+
+        Arguments:
+            option: option providing black_scholes_price(asset_price, sigma, r, time_to_maturity)
+            asset_price: current asset price
+            sigma: volatility of the diffusion
+            r: the risk-free interest rate
+            time_to_maturity: time to maturity in years
+            terms: number of terms of the series
+        """
+
+        t = time_to_maturity
+        lam = self.lam * (1 + self.k)
+        price = 0
+        for n in range(terms):
+            sigma_n = np.sqrt(sigma ** 2 + n * self.delta ** 2 / t)
+            r_n = r - self.lam * self.k + n * np.log(1 + self.k) / t
+            weight = np.exp(-lam * t) * (lam * t) ** n / math.factorial(n)
+            price = price + weight * option.black_scholes_price(asset_price, sigma_n, r_n, t)
+        return price
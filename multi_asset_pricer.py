@@ -0,0 +1,104 @@
+from option_pricer import OptionPricer
+import numpy as np
+
+
+class MultiAssetPricer(OptionPricer):
+    """ Monte Carlo Pricer for options on several correlated underlyings
+
+    Every asset follows its own geometric Brownian motion (see OptionPricer.paths_from_normals), the
+    Brownian motions being correlated with the given correlation matrix. init_asset_price, sigma and mu are
+    arrays with one entry per asset. The Cholesky factor of the correlation matrix is computed once per
+    set_correlation, and the shocks of all assets, paths and steps are correlated with one matrix product.
+    Paths are (assets x simulations x steps+1) arrays; pricing, streaming and antithetic variates work as
+    with OptionPricer.
+
+    Options priced by this pricer provide payoff_from_paths for such arrays (see BasketOption,
+    SpreadOption, BestOfOption and WorstOfOption). Only pseudo random numbers and no models are supported.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.init_asset_price = np.zeros(1)
+        self.sigma = np.zeros(1)
+        self.mu = np.zeros(1)
+        self.correlation = np.eye(1)
+        self.cholesky = np.eye(1)
+
+    @property
+    def assets(self):
+        return len(self.init_asset_price)
+
+    def set_init_asset_price(self, asset_prices):
+        self.init_asset_price = np.asarray(asset_prices, dtype=float)
+
+    def set_sigma(self, sigmas):
+        self.sigma = np.asarray(sigmas, dtype=float)
+
+    def set_mu(self, mus):
+        self.mu = np.asarray(mus, dtype=float)
+
+    def set_model(self, model):
+        if model is not None:
+            raise ValueError("MultiAssetPricer supports the geometric Brownian motion only")
+
+    def set_correlation(self, correlation):
+        """ Sets the (assets x assets) correlation matrix of the Brownian motions and factors it. Raises
+            a ValueError if the matrix is not a symmetric positive definite correlation matrix. """
+
+        correlation = np.asarray(correlation, dtype=float)
+        if correlation.ndim != 2 or correlation.shape[0] != correlation.shape[1]:
+            raise ValueError("The correlation matrix must be square")
+        if not np.allclose(correlation, correlation.T) or not np.allclose(np.diag(correlation), 1):
+            raise ValueError("The correlation matrix must be symmetric with a unit diagonal")
+        try:
+            cholesky = np.linalg.cholesky(correlation)
+        except np.linalg.LinAlgError:
+            raise ValueError("The correlation matrix is not positive definite")
+        self.correlation = correlation
+        self.cholesky = cholesky
+
+    def draw_normals(self, simulations, steps):
+        """ Draws the (assets x simulations x steps) array of correlated standard normal shocks. With
+            antithetic variates, simulations is rounded up to an even number and path i of the second
+            half is the mirror image of path i of the first half. """
+
+        if self.antithetic:
+            normals = self.draw_independent_normals((simulations + 1) // 2, steps)
+            return np.concatenate((normals, -normals), axis=1)
+        return self.draw_independent_normals(simulations, steps)
+
+    def draw_independent_normals(self, simulations, steps):
+        if self.sequence != OptionPricer.PSEUDO_RANDOM:
+            raise ValueError("MultiAssetPricer supports pseudo random numbers only")
+        if self.correlation.shape != (self.assets, self.assets):
+            raise ValueError("The correlation matrix does not match the %d assets" % self.assets)
+        self.instrumentation.count("random_numbers", self.assets * simulations * steps)
+        with self.instrumentation.phase("rng"):
+            normals = self.random_state.standard_normal((self.assets, simulations * steps))
+            # One matrix product correlates the shocks of all paths and steps
+            return (self.cholesky @ normals).reshape(self.assets, simulations, steps)
+
+    def paths_from_normals(self, normals):
+        """ Builds the (assets x simulations x steps+1) array of asset price paths from correlated
+            normal shocks, with the schemes of OptionPricer.paths_from_normals. normals is overwritten. """
+
+        (assets, simulations, steps) = normals.shape
+        self.instrumentation.count("paths", simulations)
+        self.instrumentation.count("steps", simulations * steps)
+        with self.instrumentation.phase("path_construction"):
+            dt = (self.maturity - self.start_time) / steps
+            sigmas = self.sigma[:, None, None]
+            mus = self.mu[:, None, None]
+
+            paths = np.empty((assets, simulations, steps + 1))
+            paths[:, :, 0] = 1
+            normals *= sigmas * np.sqrt(dt)
+            if self.scheme == OptionPricer.EXACT:
+                normals += (mus - sigmas ** 2 / 2) * dt
+                np.cumsum(normals, axis=2, out=paths[:, :, 1:])
+                np.exp(paths[:, :, 1:], out=paths[:, :, 1:])
+            else:
+                normals += 1 + mus * dt
+                np.cumprod(normals, axis=2, out=paths[:, :, 1:])
+            paths *= self.init_asset_price[:, None, None]
+        return paths
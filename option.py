@@ -1,4 +1,5 @@
 from option_types import OptionType
+from greeks import Greeks
 import numpy as np
 from scipy.stats import norm
 
@@ -6,6 +7,8 @@ from scipy.stats import norm
 class Option:
     """ Plain Vanilla Call or Put Option """
 
+    path_dependent = False
+
     def __init__(self, strike, option_type=OptionType.CALL):
         self.strike = strike
         self.option_type = option_type
@@ -21,7 +24,29 @@ class Option:
         last_asset_price = series.iloc[-1]
         return self.payoff(last_asset_price)
 
-    def black_scholes_price(self, asset_price, sigma, r, time_to_maturity=1, D=0):
+    def payoff_from_paths(self, paths):
+        """ Vectorized payoff for an array of asset price paths (one path per row). """
+        last_asset_prices = paths[:, -1]
+        if self.option_type == OptionType.CALL:
+            return np.maximum(last_asset_prices - self.strike, 0)
+        elif self.option_type == OptionType.PUT:
+            return np.maximum(self.strike - last_asset_prices, 0)
+        return np.zeros(len(paths))
+
+    def payoff_gradient_from_paths(self, paths):
+        """ Derivative of the payoff with respect to every asset price of paths, for pathwise Greeks. """
+        gradient = np.zeros(paths.shape)
+        if self.option_type == OptionType.CALL:
+            gradient[:, -1] = paths[:, -1] > self.strike
+        elif self.option_type == OptionType.PUT:
+            gradient[:, -1] = np.where(paths[:, -1] < self.strike, -1.0, 0.0)
+        return gradient
+
+    def control_variate(self, paths, times, asset_price, sigma, mu):
+        """ Control variate: the terminal asset price (see terminal_control_variate). """
+        return terminal_control_variate(paths, times, asset_price, mu)
+
+    def black_scholes_price(self, asset_price, sigma, r, time_to_maturity=1, D=0, strike=None):
         """ Calculates value of option according to Black-Scholes-Formula.
 
         Arguments:
@@ -30,13 +55,70 @@ class Option:
             r: the risk-free interest rate
             time_to_maturity: time to maturity in years
             D: cumulative dividends of underlying asset payed until maturity of the option
+            strike: strike of the option (Default: strike of this option)
+
+        All numeric arguments may be NumPy arrays, which are broadcast against each other to price a whole
+        grid of contracts in one call.
         """
 
-        d1 = (np.log(asset_price / self.strike) + (r - D + 1 / 2 * sigma ** 2) * time_to_maturity) / \
+        asset_price = np.asarray(asset_price, dtype=float)
+        strike = np.asarray(self.strike if strike is None else strike, dtype=float)
+        d1 = (np.log(asset_price / strike) + (r - D + 1 / 2 * sigma ** 2) * time_to_maturity) / \
                 (sigma * np.sqrt(time_to_maturity))
         d2 = d1 - (sigma * np.sqrt(time_to_maturity))
         if self.option_type == OptionType.CALL:
-            return asset_price*np.exp(-D*time_to_maturity)*norm.cdf(d1) - self.strike*np.exp(-r*time_to_maturity)*norm.cdf(d2)
+            return asset_price*np.exp(-D*time_to_maturity)*norm.cdf(d1) - strike*np.exp(-r*time_to_maturity)*norm.cdf(d2)
         elif self.option_type == OptionType.PUT:
-            return -asset_price*np.exp(-D*time_to_maturity)*norm.cdf(-d1) + self.strike*np.exp(-r*time_to_maturity)*norm.cdf(-d2)
+            return -asset_price*np.exp(-D*time_to_maturity)*norm.cdf(-d1) + strike*np.exp(-r*time_to_maturity)*norm.cdf(-d2)
         return 0
+
+    def black_scholes_greeks(self, asset_price, sigma, r, time_to_maturity=1, D=0, strike=None):
+        """ Calculates price, delta, gamma, vega and rho of the option according to Black-Scholes-Formula.
+
+        Arguments:
+            asset_price: current asset price
+            sigma: volatility of underlying asset in std-deviations of returns
+            r: the risk-free interest rate
+            time_to_maturity: time to maturity in years
+            D: cumulative dividends of underlying asset payed until maturity of the option
+            strike: strike of the option (Default: strike of this option)
+
+        All numeric arguments may be NumPy arrays, which are broadcast against each other to price a whole
+        grid of contracts in one call.
+        """
+
+        t = time_to_maturity
+        asset_price = np.asarray(asset_price, dtype=float)
+        strike = np.asarray(self.strike if strike is None else strike, dtype=float)
+        d1 = (np.log(asset_price / strike) + (r - D + 1 / 2 * sigma ** 2) * t) / (sigma * np.sqrt(t))
+        d2 = d1 - (sigma * np.sqrt(t))
+
+        greeks = Greeks()
+        greeks.price = self.black_scholes_price(asset_price, sigma, r, t, D, strike)
+        greeks.gamma = np.exp(-D * t) * norm.pdf(d1) / (asset_price * sigma * np.sqrt(t))
+        greeks.vega = asset_price * np.exp(-D * t) * norm.pdf(d1) * np.sqrt(t)
+        if self.option_type == OptionType.CALL:
+            greeks.delta = np.exp(-D * t) * norm.cdf(d1)
+            greeks.rho = strike * t * np.exp(-r * t) * norm.cdf(d2)
+        elif self.option_type == OptionType.PUT:
+            greeks.delta = -np.exp(-D * t) * norm.cdf(-d1)
+            greeks.rho = -strike * t * np.exp(-r * t) * norm.cdf(-d2)
+        greeks.method = "analytic"
+        return greeks
+
+
+def terminal_control_variate(paths, times, asset_price, mu):
+    """ Control variate for Monte Carlo pricing: the terminal asset price, whose expectation is
+        asset_price * exp(mu * T). Returns the control value of each path and its expectation. """
+    return (paths[:, -1], asset_price * np.exp(mu * times[-1]))
+
+
+def vanilla_control_variate(strike, option_type, paths, times, asset_price, sigma, mu):
+    """ Control variate for Monte Carlo pricing: the plain vanilla option with strike and option_type, whose
+        expected payoff follows from its Black-Scholes price. Returns the control value of each path and
+        its expectation. """
+    vanilla_option = Option(strike, option_type)
+    time_to_maturity = times[-1]
+    return (vanilla_option.payoff_from_paths(paths),
+            vanilla_option.black_scholes_price(asset_price, sigma, mu, time_to_maturity) *
+            np.exp(mu * time_to_maturity))
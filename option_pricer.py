@@ -1,12 +1,44 @@
 import numpy as np
 import pandas as pd
+from scipy.stats import norm
+import copy
+import time
+from running_statistics import RunningStatistics
+from quasi_monte_carlo import sobol_normals
+from instrumentation import NullInstrumentation
+
+
+class PricingResult:
+    def __init__(self):
+        self.price = None
+        self.standard_error = None
+        self.paths = None
+        self.variance_reduction = 1.0
+        self.wall_time = None
+        self.converged = None
 
 
 class OptionPricer:
     """ Monte Carlo Option Pricer """
 
+    (EULER, EXACT) = range(2)
+    (PSEUDO_RANDOM, SOBOL) = range(2)
+
     def __init__(self):
-        self.data = pd.DataFrame()
+        self.paths = None
+        self.time_grid = None
+        self._data = None
+        self.random_state = np.random.default_rng()
+        self.seed = None
+        self.sample_index_cache = {}
+        self.scheme = OptionPricer.EULER
+        self.sequence = OptionPricer.PSEUDO_RANDOM
+        self.antithetic = False
+        self.control_variates = False
+        self.barrier_correction = False
+        self.model = None
+        self.history = None
+        self.instrumentation = NullInstrumentation()
         self.risk_free_rate = 0
         self.init_asset_price = 0
         self.sigma = 0
@@ -32,34 +64,171 @@ class OptionPricer:
     def set_maturity(self, maturity):
         self.maturity = maturity
 
+    def set_scheme(self, scheme):
+        """ Sets the discretisation scheme of the asset price model: EULER (as used in the paper) or
+            EXACT (log-normal stepping without discretisation bias). """
+        self.scheme = scheme
+
+    def set_sequence(self, sequence):
+        """ Sets the source of the normal shocks: PSEUDO_RANDOM numbers or scrambled SOBOL points with
+            Brownian bridge construction (randomised quasi-Monte Carlo). """
+        self.sequence = sequence
+
+    def set_antithetic(self, antithetic):
+        """ Enables antithetic variates: every draw of normal shocks Z is paired with -Z. """
+        self.antithetic = antithetic
+
+    def set_control_variates(self, control_variates):
+        """ Enables control variates for options that provide one (see control_variate of the option
+            classes). The control expectations are those of the exact log-normal model, so the
+            estimates are unbiased with the EXACT scheme. """
+        self.control_variates = control_variates
+
+    def set_barrier_correction(self, barrier_correction):
+        """ Enables the Brownian bridge correction for options providing continuous_payoff_from_paths
+            (barrier options): barrier crossings between the simulated points are accounted for with
+            their exact probability, which yields continuously monitored prices from coarse grids. """
+        self.barrier_correction = barrier_correction
+
+    def set_model(self, model):
+        """ Sets the model of the asset price, e.g. a HestonModel or MertonJumpModel (Default: None, the
+            geometric Brownian motion of paths_from_normals). A model provides draw_shocks and
+            paths_from_shocks and uses init_asset_price, mu, start_time and maturity of this pricer.
+            Control variates and the barrier correction assume the geometric Brownian motion and are not
+            applied with a model. """
+        self.model = model
+
+    def set_history(self, history):
+        """ Sets the PathHistory of a trade in progress (Default: None, a new trade). The history holds the
+            asset prices observed before start_time; set start_time to the valuation time and
+            init_asset_price to the current asset price, so the paths only cover the remaining time to
+            maturity. Path dependent options combine the history with the simulated paths. """
+        self.history = history
+
+    def set_instrumentation(self, instrumentation):
+        """ Sets the Instrumentation recording timings and counters (Default: NullInstrumentation, which
+            records nothing). """
+        self.instrumentation = instrumentation
+
+    def set_seed(self, seed):
+        """ Seeds the random number generator. Accepts anything np.random.default_rng accepts,
+            including a np.random.SeedSequence. """
+        self.seed = seed
+        self.random_state = np.random.default_rng(seed)
+
+    def clone(self, seed=None):
+        """ Returns a pricer with the same parameters, no simulated paths and its own random number
+            generator seeded with seed. """
+        option_pricer = copy.copy(self)
+        option_pricer.paths = None
+        option_pricer.time_grid = None
+        option_pricer._data = None
+        option_pricer.set_seed(seed)
+        return option_pricer
+
     def discount(self, value, time=1):
         return value / np.exp(self.risk_free_rate * time)
 
-    def run_monte_carlo_simulations(self, simulations=1000, steps=100):
+    @property
+    def data(self):
+        """ Simulated paths as DataFrame (one column per path, time as index). Built lazily from
+            self.paths, since only legacy callers need the pandas representation. """
+        if self._data is None:
+            if self.paths is None:
+                self._data = pd.DataFrame()
+            else:
+                self._data = pd.DataFrame(self.paths.T, index=self.time_grid)
+        return self._data
+
+    def make_time_grid(self, steps):
         dt = (self.maturity - self.start_time) / steps
-        for n in range(simulations):
-            asset_price = self.init_asset_price
-            time = self.start_time
-            asset_prices = [asset_price]
-            asset_time = [time]
-
-            for i in range(steps):
-                # Model of the asset price:
-                #   dS = mu*S*dt + sigma*S*dX, X ~ N(0,dt)
-                asset_price *= 1 + self.mu * dt + self.sigma * np.sqrt(dt) * np.random.normal()
-                time += dt
-                asset_prices.append(asset_price)
-                asset_time.append(time)
-
-            asset_history = pd.Series(asset_prices, asset_time)
-            self.data[n] = asset_history
+        # Accumulate the time sequentially (as the original step loop did) so that the float
+        # values of the grid are exactly reproducible.
+        return np.cumsum(np.concatenate(([self.start_time], np.full(steps, dt))))
+
+    def draw_normals(self, simulations, steps):
+        """ Draws the (simulations x steps) matrix of standard normal shocks in one call. With antithetic
+            variates, row i of the second half is the negative of row i of the first half and simulations
+            is rounded up to an even number. """
+        if self.antithetic:
+            normals = self.draw_independent_normals((simulations + 1) // 2, steps)
+            return np.concatenate((normals, -normals))
+        return self.draw_independent_normals(simulations, steps)
+
+    def draw_independent_normals(self, simulations, steps):
+        self.instrumentation.count("random_numbers", simulations * steps)
+        with self.instrumentation.phase("rng"):
+            if self.sequence == OptionPricer.SOBOL:
+                return sobol_normals(simulations, steps, self.random_state)
+            return self.random_state.standard_normal((simulations, steps))
+
+    def paths_from_normals(self, normals):
+        """ Builds asset price paths from a (simulations x steps) matrix of standard normal shocks.
+
+        Model of the asset price:
+            dS = mu*S*dt + sigma*S*dX, X ~ N(0,dt)
+
+        EULER scheme:  S(t+dt) = S(t) * (1 + mu*dt + sigma*sqrt(dt)*Z)
+        EXACT scheme:  S(t+dt) = S(t) * exp((mu - sigma^2/2)*dt + sigma*sqrt(dt)*Z)
+
+        Returns a (simulations x steps+1) array, the first column being the initial asset price.
+        """
+
+        simulations, steps = normals.shape
+        self.instrumentation.count("paths", simulations)
+        self.instrumentation.count("steps", simulations * steps)
+        with self.instrumentation.phase("path_construction"):
+            dt = (self.maturity - self.start_time) / steps
+            paths = np.empty((simulations, steps + 1))
+            paths[:, 0] = self.init_asset_price
+            if self.scheme == OptionPricer.EXACT:
+                log_growth = (self.mu - self.sigma ** 2 / 2) * dt + self.sigma * np.sqrt(dt) * normals
+                np.cumsum(log_growth, axis=1, out=paths[:, 1:])
+                np.exp(paths[:, 1:], out=paths[:, 1:])
+            else:
+                growth = 1 + self.mu * dt + self.sigma * np.sqrt(dt) * normals
+                np.cumprod(growth, axis=1, out=paths[:, 1:])
+            paths[:, 1:] *= self.init_asset_price
+        return paths
+
+    def required_steps(self, options, steps):
+        """ Returns the number of steps needed to price options. With the EXACT scheme, options whose
+            payoff only depends on the terminal asset price (path_dependent = False) are priced exactly
+            from a single step, as with models whose steps are exact (exact = True). """
+        exact = self.model.exact if self.model is not None else self.scheme == OptionPricer.EXACT
+        if exact and not any(getattr(option, "path_dependent", True) for option in options):
+            return 1
+        return steps
+
+    def generate_paths(self, simulations=1000, steps=100):
+        if self.model is not None:
+            shocks = self.model.draw_shocks(self, simulations, steps)
+            self.instrumentation.count("paths", simulations)
+            self.instrumentation.count("steps", simulations * steps)
+            with self.instrumentation.phase("path_construction"):
+                return self.model.paths_from_shocks(self, shocks)
+        return self.paths_from_normals(self.draw_normals(simulations, steps))
+
+    def run_monte_carlo_simulations(self, simulations=1000, steps=100):
+        self.set_paths(self.generate_paths(simulations, steps), self.make_time_grid(steps))
+
+    def set_paths(self, paths, time_grid):
+        """ Sets the paths to price from, e.g. paths loaded from a PathStore. """
+        self.paths = paths
+        self.time_grid = time_grid
+        self._data = None
+
+    def payoffs_from_paths(self, option, paths):
+        """ Returns the payoff of each path (row) of paths. Uses the vectorized payoff of the option
+            if it provides one and falls back to evaluating payoff_from_series path by path. """
+        if hasattr(option, "payoff_from_paths"):
+            if self.history is not None and getattr(option, "path_dependent", True):
+                return option.payoff_from_paths(paths, self.history)
+            return option.payoff_from_paths(paths)
+        return np.array([option.payoff_from_series(pd.Series(path)) for path in paths])
 
     def simulated_price_continuous_sampling(self, option, time_to_maturity=1):
-        payoff_data = []
-        for n in self.data.columns:
-            payoff_data.append(option.payoff_from_series(self.data[n]))
-        payoffs = pd.Series(payoff_data)
-        return self.discount(payoffs.mean(), time_to_maturity)
+        return self.price_option(option, time_to_maturity).price
 
     def sample_data(self, series, sample_distance):
         """ Samples data from series. The index of the series has to be numeric, but can be float as well.
@@ -81,11 +250,21 @@ class OptionPricer:
             => In this case the series is reduced.
         """
 
+        positions = self.sample_indices(np.asarray(series.index, dtype=float), sample_distance)
+        return series.iloc[positions]
+
+    def sample_indices(self, time_grid, sample_distance):
+        """ Returns the positions within time_grid that are sampled by sample_data. The positions are
+            cached per (time grid, sample_distance), as all paths of a simulation share one grid. """
+
+        key = (time_grid.tobytes(), sample_distance)
+        if key in self.sample_index_cache:
+            return self.sample_index_cache[key]
+
         sample_pos = 0
-        index = series.index
+        index = time_grid.tolist()
         index_pos = 0
-        sampled_values = []
-        sampled_index = []
+        positions = []
 
         while index_pos < len(index) - 1:
             if sample_pos < index[index_pos]:
@@ -93,20 +272,218 @@ class OptionPricer:
             elif sample_pos >= index[index_pos + 1]:
                 index_pos += 1
             elif sample_pos >= index[index_pos]:
-                sampled_values.append(series[index[index_pos]])
-                sampled_index.append(index[index_pos])
+                positions.append(index_pos)
                 sample_pos += sample_distance
                 index_pos += 1
-        sampled_values.append(series[index[-1]])
-        sampled_index.append(index[-1])
+        positions.append(len(index) - 1)
 
-        return pd.Series(sampled_values, sampled_index)
+        positions = np.array(positions)
+        self.sample_index_cache[key] = positions
+        return positions
 
     def simulated_price_discrete_sampling(self, option, time_to_maturity=1, sample_distance=0.1):
-        payoff_data = []
-        for n in self.data.columns:
-            sampled_data = self.sample_data(self.data[n], sample_distance)
-            payoff_data.append(option.payoff_from_series(sampled_data))
-        payoffs = pd.Series(payoff_data)
-        return self.discount(payoffs.mean(), time_to_maturity)
+        return self.price_option(option, time_to_maturity, sample_distance).price
+
+    def sample_paths(self, paths, time_grid, sample_distance=None):
+        """ Samples every path (row) of paths like sample_data. Returns paths unchanged for
+            continuous sampling (sample_distance=None). The time axis is the last axis of paths. """
+        if sample_distance is None:
+            return paths
+        with self.instrumentation.phase("sampling"):
+            return paths[..., self.sample_indices(time_grid, sample_distance)]
+
+    def sample_times(self, time_grid, sample_distance=None):
+        """ Returns the observation times of the sampled paths, measured from start_time. """
+        if sample_distance is not None:
+            time_grid = time_grid[self.sample_indices(time_grid, sample_distance)]
+        return time_grid - self.start_time
+
+    def payoff_samples(self, option, sampled_paths, sample_times):
+        """ Returns (samples, payoffs). payoffs are the plain payoffs of the paths, samples are independent
+            estimates of the expected payoff after applying the enabled variance reduction techniques:
+            antithetic pairs are averaged into one sample, then control variates adjust every sample. """
+
+        with self.instrumentation.phase("payoff_evaluation"):
+            if self.barrier_correction and self.model is None and hasattr(option, "continuous_payoff_from_paths"):
+                payoffs = option.continuous_payoff_from_paths(sampled_paths, sample_times, self.sigma, self.history)
+            else:
+                payoffs = self.payoffs_from_paths(option, sampled_paths)
+
+        with self.instrumentation.phase("reduction"):
+            samples = payoffs
+            if self.antithetic:
+                samples = self.antithetic_average(payoffs)
+            if self.control_variates and self.model is None and hasattr(option, "control_variate"):
+                (controls, expected_control) = option.control_variate(sampled_paths, sample_times,
+                                                                      self.init_asset_price, self.sigma, self.mu)
+                if self.antithetic:
+                    controls = self.antithetic_average(controls)
+                control_variance = controls.var()
+                if control_variance > 0:
+                    beta = np.cov(samples, controls, bias=True)[0, 1] / control_variance
+                    samples = samples - beta * (controls - expected_control)
+        return (samples, payoffs)
+
+    @staticmethod
+    def antithetic_average(values):
+        half = len(values) // 2
+        return (values[:half] + values[half:]) / 2
+
+    def update_statistics(self, option, paths, time_grid, sample_distance, statistics, raw_statistics):
+        (samples, payoffs) = self.payoff_samples(option, self.sample_paths(paths, time_grid, sample_distance),
+                                                 self.sample_times(time_grid, sample_distance))
+        with self.instrumentation.phase("reduction"):
+            statistics.update(samples)
+            raw_statistics.update(payoffs)
+
+    def pricing_result(self, statistics, raw_statistics, time_to_maturity=1):
+        """ Creates the PricingResult from the statistics of the (variance reduced) samples and the
+            statistics of the plain payoffs. The variance reduction factor is the ratio of the variance of
+            the plain Monte Carlo estimator to the variance of the estimator actually used. """
+
+        result = PricingResult()
+        result.price = self.discount(statistics.mean, time_to_maturity)
+        result.standard_error = self.discount(statistics.standard_error, time_to_maturity)
+        result.paths = raw_statistics.count
+        if statistics.standard_error > 0:
+            result.variance_reduction = (raw_statistics.standard_error / statistics.standard_error) ** 2
+        return result
+
+    def price_option(self, option, time_to_maturity=1, sample_distance=None):
+        """ Prices option from the paths of the last call of run_monte_carlo_simulations and returns
+            a PricingResult with price, standard error and variance reduction factor. """
+
+        return self.price_options([option], time_to_maturity, sample_distance)[0]
+
+    def price_options(self, options, time_to_maturity=1, sample_distance=None):
+        """ Prices all options from the same paths of the last call of run_monte_carlo_simulations.
+            Returns a list of PricingResults in the order of options. Since all options see the same
+            paths, their estimates are correlated, which makes comparisons between them sharper. """
+
+        sampled_paths = self.sample_paths(self.paths, self.time_grid, sample_distance)
+        sample_times = self.sample_times(self.time_grid, sample_distance)
+        results = []
+        for option in options:
+            statistics = RunningStatistics()
+            raw_statistics = RunningStatistics()
+            (samples, payoffs) = self.payoff_samples(option, sampled_paths, sample_times)
+            with self.instrumentation.phase("reduction"):
+                statistics.update(samples)
+                raw_statistics.update(payoffs)
+            results.append(self.pricing_result(statistics, raw_statistics, time_to_maturity))
+        return results
+
+    def price_option_randomized_qmc(self, option, simulations=1024, steps=100, scrambles=16, time_to_maturity=1,
+                                    sample_distance=None):
+        """ Prices option with randomised quasi-Monte Carlo: the option is priced from scrambles independently
+            scrambled Sobol path sets of simulations paths each. Points within one scramble are not
+            independent, so the standard error is estimated from the spread of the prices across scrambles.
+            The variance reduction factor compares it to plain Monte Carlo with the same number of paths.
+        """
+
+        steps = self.required_steps([option], steps)
+        time_grid = self.make_time_grid(steps)
+        sequence = self.sequence
+        self.set_sequence(OptionPricer.SOBOL)
+        try:
+            scramble_statistics = RunningStatistics()
+            raw_statistics = RunningStatistics()
+            for i in range(scrambles):
+                statistics = RunningStatistics()
+                paths = self.generate_paths(simulations, steps)
+                self.update_statistics(option, paths, time_grid, sample_distance, statistics, raw_statistics)
+                scramble_statistics.update([statistics.mean])
+        finally:
+            self.set_sequence(sequence)
+
+        result = PricingResult()
+        result.price = self.discount(scramble_statistics.mean, time_to_maturity)
+        result.standard_error = self.discount(scramble_statistics.standard_error, time_to_maturity)
+        result.paths = raw_statistics.count
+        if scramble_statistics.standard_error > 0:
+            result.variance_reduction = (raw_statistics.standard_error / scramble_statistics.standard_error) ** 2
+        return result
+
+    def price_option_to_accuracy(self, option, target_error=None, relative_error=None, confidence_level=None,
+                                 batch_size=10000, steps=100, max_paths=None, max_time=None, time_to_maturity=1,
+                                 sample_distance=None):
+        """ Prices option by generating batches of batch_size paths until the target accuracy is reached or
+            the path or time budget is spent.
+
+        Arguments:
+            option: the option to price
+            target_error: target absolute standard error of the price
+            relative_error: target standard error relative to the price
+            confidence_level: if given (e.g. 0.95), the targets apply to the half-width of the confidence
+                interval of this level instead of the standard error
+            batch_size: number of paths per batch
+            steps: number of price movements within each path
+            max_paths: maximum number of paths (Default: no limit)
+            max_time: maximum wall time in seconds (Default: no limit)
+            time_to_maturity: time to maturity used for discounting
+            sample_distance: sample distance for discrete sampling (Default: continuous sampling)
+
+        Returns a PricingResult with price, standard error, number of paths used, wall time and whether
+        the target was met (converged).
+        """
+
+        if target_error is None and relative_error is None and max_paths is None and max_time is None:
+            raise ValueError("A target error or a path or time budget is required")
+
+        quantile = 1
+        if confidence_level is not None:
+            quantile = norm.ppf(1 / 2 + confidence_level / 2)
+
+        start = time.perf_counter()
+        steps = self.required_steps([option], steps)
+        time_grid = self.make_time_grid(steps)
+        statistics = RunningStatistics()
+        raw_statistics = RunningStatistics()
+        converged = False
+        while True:
+            batch = batch_size
+            if max_paths is not None:
+                batch = min(batch, max_paths - raw_statistics.count)
+            if batch <= 0:
+                break
+            paths = self.generate_paths(batch, steps)
+            self.update_statistics(option, paths, time_grid, sample_distance, statistics, raw_statistics)
+
+            error = quantile * self.discount(statistics.standard_error, time_to_maturity)
+            price = self.discount(statistics.mean, time_to_maturity)
+            converged = statistics.count >= 2 and \
+                (target_error is None or error <= target_error) and \
+                (relative_error is None or error <= relative_error * abs(price)) and \
+                (target_error is not None or relative_error is not None)
+            if converged or (max_time is not None and time.perf_counter() - start >= max_time):
+                break
+
+        result = self.pricing_result(statistics, raw_statistics, time_to_maturity)
+        result.wall_time = time.perf_counter() - start
+        result.converged = converged
+        return result
+
+    def price_option_streaming(self, option, simulations=1000, steps=100, chunk_size=10000, time_to_maturity=1,
+                               sample_distance=None):
+        """ Prices option from paths generated in chunks of chunk_size paths. The payoffs of each chunk
+            are reduced into running statistics and the chunk is discarded, so peak memory depends on
+            chunk_size only. Like price_option_randomized_qmc, the paths only have the steps of
+            required_steps([option], steps). For the same seed and pseudo random numbers the result matches
+            run_monte_carlo_simulations(simulations, required_steps([option], steps)) followed by
+            price_option. With antithetic variates the pairs are formed within each chunk, and control
+            variate coefficients are estimated per chunk, so the results then differ slightly.
+        """
+
+        steps = self.required_steps([option], steps)
+        time_grid = self.make_time_grid(steps)
+        statistics = RunningStatistics()
+        raw_statistics = RunningStatistics()
+        remaining = simulations
+        while remaining > 0:
+            chunk = min(chunk_size, remaining)
+            paths = self.generate_paths(chunk, steps)
+            self.update_statistics(option, paths, time_grid, sample_distance, statistics, raw_statistics)
+            # Paths run along the second to last axis (antithetic variates round chunk up to even)
+            remaining -= paths.shape[-2]
+        return self.pricing_result(statistics, raw_statistics, time_to_maturity)
 
@@ -0,0 +1,79 @@
+from option import Option
+from binary_option import BinaryOption
+from barrier_option import BarrierOption
+from asian_option import AsianOption
+from fixed_lookback_option import FixedLookbackOption
+from floating_lookback_option import FloatingLookbackOption
+from option_types import OptionType
+import numpy as np
+
+
+# Option codes and names
+OPTION_NAMES = {
+    "CO": "Plain Vanilla Call Option",
+    "PO": "Plain Vanilla Put Option",
+    "FLCO": "Floating Lookback Call Option",
+    "FLPO": "Floating Lookback Put Option",
+    "XLCO": "Fixed Lookback Call Option",
+    "XLPO": "Fixed Lookback Put Option",
+    "BCO": "Binary Call Option",
+    "BPO": "Binary Put Option",
+    "ACO": "Asian Call Option",
+    "APO": "Asian Put Option",
+    "UOCO": "Up-and-Out Barrier Call Option",
+    "UOPO": "Up-and-Out Barrier Put Option",
+    "DOCO": "Down-and-Out Barrier Call Option",
+    "DOPO": "Down-and-Out Barrier Put Option",
+    "UICO": "Up-and-In Barrier Call Option",
+    "UIPO": "Up-and-In Barrier Put Option",
+    "DICO": "Down-and-In Barrier Call Option",
+    "DIPO": "Down-and-In Barrier Put Option"
+}
+
+BARRIER_CODES = {"UOCO", "UOPO", "DOCO", "DOPO", "UICO", "UIPO", "DICO", "DIPO"}
+
+
+def create_option(option_code, strike=None, barrier=None, binary_payoff=100):
+    """ Creates the option of option_code (see OPTION_NAMES). Raises a ValueError for unknown codes
+        and for barrier options without barrier. """
+
+    if option_code not in OPTION_NAMES:
+        raise ValueError("Unknown option code %s" % option_code)
+    option_type = OptionType.PUT if option_code.endswith("PO") else OptionType.CALL
+
+    if option_code in BARRIER_CODES:
+        if barrier is None:
+            raise ValueError("Option code %s needs a barrier" % option_code)
+        barrier_level = BarrierOption.UP if option_code[0] == "U" else BarrierOption.DOWN
+        barrier_type = BarrierOption.KNOCK_OUT if option_code[1] == "O" else BarrierOption.KNOCK_IN
+        return BarrierOption(strike, barrier, option_type=option_type, barrier_type=barrier_type,
+                             barrier_level=barrier_level)
+    if option_code in ("CO", "PO"):
+        return Option(strike, option_type=option_type)
+    if option_code in ("FLCO", "FLPO"):
+        return FloatingLookbackOption(option_type=option_type)
+    if option_code in ("XLCO", "XLPO"):
+        return FixedLookbackOption(strike, option_type=option_type)
+    if option_code in ("BCO", "BPO"):
+        return BinaryOption(strike, payoff=binary_payoff, option_type=option_type)
+    return AsianOption(strike, option_type=option_type)
+
+
+def create_option_shortcuts(strike, binary_payoff=100, barrier=None):
+    """ Returns a dictionary mapping option codes to (name, option). Barrier options are only
+        included if a barrier is given. """
+
+    return {option_code: (name, create_option(option_code, strike, barrier, binary_payoff))
+            for (option_code, name) in OPTION_NAMES.items()
+            if barrier is not None or option_code not in BARRIER_CODES}
+
+
+def reference_price(option, asset_price, sigma, r, time_to_maturity=1):
+    """ Returns the closed-form price of option at the start of its life, or NaN if the option class
+        has none (Asian options). """
+
+    if isinstance(option, FixedLookbackOption):
+        return option.black_scholes_price(asset_price, asset_price, asset_price, sigma, r, time_to_maturity)
+    if hasattr(option, "black_scholes_price"):
+        return option.black_scholes_price(asset_price, sigma, r, time_to_maturity)
+    return np.nan
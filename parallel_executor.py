@@ -0,0 +1,98 @@
+from concurrent.futures import ProcessPoolExecutor
+from running_statistics import RunningStatistics
+import numpy as np
+import os
+
+
+def chunk_statistics(option_pricer, option, simulations, steps, sample_distance=None):
+    """ Simulates one chunk of paths and returns the running statistics of its (variance reduced)
+        samples and of its plain payoffs. """
+
+    time_grid = option_pricer.make_time_grid(steps)
+    paths = option_pricer.generate_paths(simulations, steps)
+    statistics = RunningStatistics()
+    raw_statistics = RunningStatistics()
+    option_pricer.update_statistics(option, paths, time_grid, sample_distance, statistics, raw_statistics)
+    return (statistics, raw_statistics)
+
+
+def instrumented_call(function, task):
+    """ Calls function(*task) in a worker process. If the first argument of the task is an option pricer
+        with enabled instrumentation, the worker's copy of the instrumentation is reset before the call
+        and returned with the result, so the parent process can merge it. """
+
+    instrumentation = getattr(task[0], "instrumentation", None) if task else None
+    if instrumentation is None or not instrumentation.enabled:
+        return (function(*task), None)
+    instrumentation.reset()
+    return (function(*task), instrumentation)
+
+
+class ParallelExecutor:
+    """ Runs independent pricing tasks on a pool of worker processes.
+
+    Every task gets its own random number stream, spawned from one np.random.SeedSequence in task order.
+    The streams do not depend on which worker executes a task, so for a given seed the results are the
+    same for any number of workers. With workers=1 the tasks run in the calling process.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers if workers else os.cpu_count()
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    @staticmethod
+    def spawn_seeds(seed, count):
+        return np.random.SeedSequence(seed).spawn(count)
+
+    def map(self, function, tasks):
+        """ Calls function(*task) for every task and returns the results in task order. Timings and
+            counters recorded by the instrumentation of an option pricer passed as first argument of a task
+            are merged back into that instrumentation. """
+
+        tasks = list(tasks)
+        if self.workers == 1 or len(tasks) < 2:
+            return [function(*task) for task in tasks]
+        for task in tasks:
+            if getattr(getattr(task[0], "instrumentation", None), "profiler", None) is not None:
+                raise ValueError("Profiling requires a single worker")
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        futures = [self.pool.submit(instrumented_call, function, task) for task in tasks]
+        results = []
+        for (task, future) in zip(tasks, futures):
+            (result, instrumentation) = future.result()
+            if instrumentation is not None:
+                task[0].instrumentation.merge(instrumentation)
+            results.append(result)
+        return results
+
+    def price_option(self, option_pricer, option, simulations=1000, steps=100, chunk_size=10000, time_to_maturity=1,
+                     sample_distance=None, seed=None):
+        """ Prices option with the paths split into chunks of chunk_size paths, which are simulated
+            on the workers with seeds spawned from seed. As with price_option_streaming, the paths only
+            have the steps of required_steps([option], steps) and control variate coefficients are
+            estimated per chunk. Returns a PricingResult. """
+
+        steps = option_pricer.required_steps([option], steps)
+        chunks = [min(chunk_size, simulations - start) for start in range(0, simulations, chunk_size)]
+        seeds = self.spawn_seeds(seed, len(chunks))
+        tasks = [(option_pricer.clone(chunk_seed), option, chunk, steps, sample_distance)
+                 for (chunk, chunk_seed) in zip(chunks, seeds)]
+
+        statistics = RunningStatistics()
+        raw_statistics = RunningStatistics()
+        for (chunk_statistics_result, chunk_raw_statistics) in self.map(chunk_statistics, tasks):
+            statistics.merge(chunk_statistics_result)
+            raw_statistics.merge(chunk_raw_statistics)
+        return option_pricer.pricing_result(statistics, raw_statistics, time_to_maturity)
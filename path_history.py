@@ -0,0 +1,53 @@
+import numpy as np
+
+
+class PathHistory:
+    """ Running statistics of the asset prices observed for a trade in progress
+
+    Keeps the running maximum, minimum, sum and count of the observations, so the history of a seasoned
+    trade is updated in O(1) per new observation. Set on an OptionPricer with set_history, the history
+    holds the observations before the start time of the pricer; the simulated paths start at the current
+    asset price and only cover the remaining time to maturity.
+    """
+
+    def __init__(self, maximum=-np.inf, minimum=np.inf, total=0.0, count=0):
+        """ Arguments:
+            maximum: highest observed asset price
+            minimum: lowest observed asset price
+            total: sum of the observed asset prices
+            count: number of observations
+        """
+
+        self.maximum = maximum
+        self.minimum = minimum
+        self.total = total
+        self.count = count
+
+    @classmethod
+    def from_prices(cls, prices):
+        history = cls()
+        history.update(prices)
+        return history
+
+    @property
+    def average(self):
+        return self.total / self.count if self.count > 0 else np.nan
+
+    def update(self, prices):
+        """ Adds observed asset prices, e.g. the closing price of the last day. """
+
+        prices = np.asarray(prices, dtype=float).ravel()
+        if len(prices) == 0:
+            return
+        self.maximum = max(self.maximum, float(prices.max()))
+        self.minimum = min(self.minimum, float(prices.min()))
+        self.total += float(prices.sum())
+        self.count += len(prices)
+
+    def merge(self, other):
+        """ Adds the observations of another history (of the following period). """
+
+        self.maximum = max(self.maximum, other.maximum)
+        self.minimum = min(self.minimum, other.minimum)
+        self.total += other.total
+        self.count += other.count
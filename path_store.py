@@ -0,0 +1,135 @@
+from heston_model import HestonModel
+from merton_jump_model import MertonJumpModel
+import numpy as np
+import json
+import struct
+
+
+class PathStore:
+    """ Simulated asset price paths with the parameters they were simulated with
+
+    The paths are kept in one contiguous (simulations x steps+1) float32 or float64 array. A store can be
+    saved to a single file and loaded again through np.memmap: several pricing processes can then share one
+    scenario set without copying it, and slices of paths are only read from disk when accessed.
+
+    File layout:
+        MAGIC, header length (8 bytes, little endian), JSON header, padding to a multiple of ALIGNMENT,
+        time grid (float64), paths (C order)
+    """
+
+    MAGIC = b"MCPATHS1"
+    ALIGNMENT = 64
+    MODELS = {model.__name__: model for model in (HestonModel, MertonJumpModel)}
+
+    def __init__(self, paths, time_grid, metadata=None):
+        self.paths = paths
+        self.time_grid = time_grid
+        self.metadata = metadata if metadata is not None else {}
+
+    @property
+    def simulations(self):
+        return self.paths.shape[0]
+
+    @property
+    def steps(self):
+        return self.paths.shape[1] - 1
+
+    @classmethod
+    def from_option_pricer(cls, option_pricer, dtype=np.float64):
+        """ Creates a store from the paths of the last call of run_monte_carlo_simulations. """
+
+        paths = np.ascontiguousarray(option_pricer.paths, dtype=dtype)
+        steps = paths.shape[1] - 1
+        seed = option_pricer.seed
+        model = option_pricer.model
+        metadata = {
+            "init_asset_price": option_pricer.init_asset_price,
+            "mu": option_pricer.mu,
+            "sigma": option_pricer.sigma,
+            "risk_free_rate": option_pricer.risk_free_rate,
+            "start_time": option_pricer.start_time,
+            "maturity": option_pricer.maturity,
+            "dt": (option_pricer.maturity - option_pricer.start_time) / steps,
+            "steps": steps,
+            "seed": seed if seed is None or isinstance(seed, int) else repr(seed),
+            "scheme": option_pricer.scheme,
+            "sequence": option_pricer.sequence,
+            "antithetic": option_pricer.antithetic,
+            "model": None if model is None else {"class": type(model).__name__, "parameters": vars(model)}
+        }
+        return cls(paths, np.asarray(option_pricer.time_grid, dtype=np.float64), metadata)
+
+    def restore(self, option_pricer):
+        """ Sets paths and model parameters of option_pricer to the ones of this store, so that options
+            can be priced from the stored scenario set. The model of the paths is restored as well, so
+            control variates and the barrier correction, which assume the geometric Brownian motion, stay
+            disabled for paths of a HestonModel or MertonJumpModel. Raises a ValueError for paths of any
+            other model. """
+
+        model = self.metadata.get("model")
+        if model is not None:
+            if model.get("class") not in PathStore.MODELS:
+                raise ValueError("Cannot restore paths of the unknown model %s" % model.get("class"))
+            model = PathStore.MODELS[model["class"]](**model["parameters"])
+
+        option_pricer.set_init_asset_price(self.metadata.get("init_asset_price", option_pricer.init_asset_price))
+        option_pricer.set_mu(self.metadata.get("mu", option_pricer.mu))
+        option_pricer.set_sigma(self.metadata.get("sigma", option_pricer.sigma))
+        option_pricer.set_risk_free_rate(self.metadata.get("risk_free_rate", option_pricer.risk_free_rate))
+        option_pricer.set_start_time(self.metadata.get("start_time", option_pricer.start_time))
+        option_pricer.set_maturity(self.metadata.get("maturity", option_pricer.maturity))
+        option_pricer.set_scheme(self.metadata.get("scheme", option_pricer.scheme))
+        option_pricer.set_sequence(self.metadata.get("sequence", option_pricer.sequence))
+        option_pricer.set_antithetic(self.metadata.get("antithetic", option_pricer.antithetic))
+        option_pricer.set_model(model)
+        option_pricer.set_paths(self.paths, self.time_grid)
+
+    def chunks(self, chunk_size):
+        """ Yields consecutive slices of at most chunk_size paths. Slices of a loaded store are read
+            from disk lazily. """
+        for start in range(0, self.simulations, chunk_size):
+            yield self.paths[start:start + chunk_size]
+
+    def save(self, filename):
+        header = json.dumps({
+            "dtype": np.dtype(self.paths.dtype).str,
+            "shape": list(self.paths.shape),
+            "metadata": self.metadata
+        }).encode("utf-8")
+        offset = PathStore.data_offset(len(header))
+
+        with open(filename, "wb") as outfile:
+            outfile.write(PathStore.MAGIC)
+            outfile.write(struct.pack("<Q", len(header)))
+            outfile.write(header)
+            outfile.write(b"\0" * (offset - len(PathStore.MAGIC) - 8 - len(header)))
+            outfile.write(np.ascontiguousarray(self.time_grid, dtype="<f8").tobytes())
+
+        paths = np.memmap(filename, dtype=self.paths.dtype, mode="r+", shape=self.paths.shape,
+                          offset=offset + 8 * len(self.time_grid))
+        paths[:] = self.paths
+        paths.flush()
+        del paths
+
+    @classmethod
+    def load(cls, filename, mode="r"):
+        """ Loads a store saved with save. The paths are memory-mapped (mode "r" is read-only, "c" is
+            copy-on-write) and only read from disk when accessed. """
+
+        with open(filename, "rb") as infile:
+            if infile.read(len(PathStore.MAGIC)) != PathStore.MAGIC:
+                raise ValueError("%s is not a path store file" % filename)
+            (header_length, ) = struct.unpack("<Q", infile.read(8))
+            header = json.loads(infile.read(header_length).decode("utf-8"))
+
+        shape = tuple(header["shape"])
+        offset = PathStore.data_offset(header_length)
+        time_grid = np.array(np.memmap(filename, dtype="<f8", mode="r", shape=(shape[1], ), offset=offset))
+        paths = np.memmap(filename, dtype=np.dtype(header["dtype"]), mode=mode, shape=shape,
+                          offset=offset + 8 * shape[1])
+        return cls(paths, time_grid, header["metadata"])
+
+    @staticmethod
+    def data_offset(header_length):
+        length = len(PathStore.MAGIC) + 8 + header_length
+        return -(-length // PathStore.ALIGNMENT) * PathStore.ALIGNMENT
@@ -0,0 +1,105 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from scipy.stats import norm
+import numpy as np
+import math
+
+
+def render_histogram(filename, errors, errors_variance):
+    """ Saves the histogram of errors with the density of N(0, errors_variance) as PNG to filename.
+        matplotlib is imported on the first call only. The figure is drawn without pyplot, so no global
+        state is shared and rendering is safe in a background thread. """
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot(1, 1, 1)
+
+    # Create plot
+
+    n, bins, patches = axes.hist(errors, 20, density=True, facecolor='gray')
+    x_max = np.abs(bins).max()
+    x_max = math.ceil(x_max * 10) / 10
+    if x_max < 1:
+        x_max = 1
+
+    # Create data for normal distribution with mean = 0, and variance = error_variance
+
+    norm_x = np.arange(-x_max, x_max, 0.01)
+    norm_y = norm.pdf(norm_x, loc=0, scale=np.sqrt(errors_variance))
+
+    y_max = math.ceil(max(n) * 10) / 10
+    axes.plot(norm_x, norm_y, color="black", linewidth=0.5)
+    axes.set_xlabel('Error')
+    axes.set_ylabel('Probability')
+    axes.axis([-x_max, x_max, 0, y_max])
+    axes.grid(False)
+
+    # Save plot as PNG
+
+    figure.savefig(filename)
+
+
+class MatplotlibPlotSink:
+    """ Plots the error histogram of every SimulationResult as PNG
+
+    Pass a sink to Simulation to get the plots; without one no plotting is done and matplotlib is never
+    imported. With background THREAD or PROCESS the figures are rendered in a background thread or
+    process while the simulation goes on; call close to wait until all plots are written.
+    """
+
+    (SYNCHRONOUS, THREAD, PROCESS) = range(3)
+
+    def __init__(self, background=SYNCHRONOUS):
+        self.background = background
+        self.executor = None
+        self.futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def filename(params):
+        params_str = "-%d-%d-%s%s" % (params.runs,
+                                      params.simulations,
+                                      params.sampling_name,
+                                      "" if params.sampling_name == "cont"
+                                         else ("-%.2f" % params.sample_interval))
+        return params.option_name + params_str + ".png"
+
+    def write(self, result, params):
+        """ Plots result, the SimulationResult of a simulation of params. """
+
+        errors = np.asarray(result.errors, dtype=float)
+        if np.isnan(errors).all():
+            # No closed-form price to measure the errors against (e.g. Asian options)
+            return
+
+        task = (MatplotlibPlotSink.filename(params), errors, result.errors_variance)
+        if self.background == MatplotlibPlotSink.SYNCHRONOUS:
+            render_histogram(*task)
+            return
+        if self.executor is None:
+            if self.background == MatplotlibPlotSink.PROCESS:
+                self.executor = ProcessPoolExecutor(max_workers=1)
+            else:
+                self.executor = ThreadPoolExecutor(max_workers=1)
+        self.futures.append(self.executor.submit(render_histogram, *task))
+
+    def wait(self):
+        """ Waits until all submitted plots are written. Errors of rendering are raised here. """
+
+        futures = self.futures
+        self.futures = []
+        for future in futures:
+            future.result()
+
+    def close(self):
+        self.wait()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
@@ -0,0 +1,54 @@
+from scipy.stats import norm, qmc
+import numpy as np
+
+
+class BrownianBridge:
+    """ Brownian bridge construction of a discretised Brownian motion.
+
+    The first normal variate determines the end point of the path, the next one the mid point, then the
+    quarter points and so on. Combined with low-discrepancy points, the first (best distributed)
+    dimensions carry most of the variance of the path.
+    """
+
+    def __init__(self, steps):
+        self.steps = steps
+
+        # For each point filled in after the end point: (point, left point, right point, left weight,
+        # right weight, standard deviation), on a unit time grid 0, 1, ..., steps.
+        self.construction = []
+        intervals = [(0, steps)]
+        while intervals:
+            (left, right) = intervals.pop(0)
+            if right - left < 2:
+                continue
+            mid = (left + right) // 2
+            self.construction.append((mid, left, right,
+                                      (right - mid) / (right - left),
+                                      (mid - left) / (right - left),
+                                      np.sqrt((mid - left) * (right - mid) / (right - left))))
+            intervals.append((left, mid))
+            intervals.append((mid, right))
+
+    def increments(self, normals):
+        """ Transforms a (simulations x steps) matrix of independent standard normals into the standard
+            normal increments of Brownian paths built by bisection. """
+
+        simulations = normals.shape[0]
+        brownian = np.zeros((simulations, self.steps + 1))
+        brownian[:, self.steps] = np.sqrt(self.steps) * normals[:, 0]
+        for (k, (mid, left, right, left_weight, right_weight, stddev)) in enumerate(self.construction):
+            brownian[:, mid] = left_weight * brownian[:, left] + right_weight * brownian[:, right] + \
+                stddev * normals[:, k + 1]
+        return np.diff(brownian, axis=1)
+
+
+def sobol_normals(simulations, steps, random_state):
+    """ Draws a (simulations x steps) matrix of standard normal shocks from a scrambled Sobol sequence,
+        mapped through the inverse normal distribution and ordered by Brownian bridge construction. Every
+        call uses a new scramble drawn from random_state, so repeated calls are independent randomised
+        quasi-Monte Carlo replications. Sobol points are best balanced for powers of two simulations. """
+
+    sobol = qmc.Sobol(d=steps, scramble=True, seed=random_state)
+    points = sobol.random(simulations)
+    points = np.clip(points, np.finfo(float).tiny, 1 - np.finfo(float).epsneg)
+    return BrownianBridge(steps).increments(norm.ppf(points))
@@ -0,0 +1,97 @@
+import numpy as np
+import hashlib
+import json
+import pickle
+import os
+
+
+class ResultCache:
+    """ On-disk cache of SimulationResults
+
+    Results are stored as one pickle file per key. The key is a SHA-256 hash of a canonical JSON
+    description of the market and model parameters of the option pricer, the option definition, the
+    SimulationParameters and the seed. A hit touches the file, and whenever the total size of the cache
+    exceeds max_size bytes, the least recently used files are evicted.
+    """
+
+    # Attributes of OptionPricer that hold simulation state rather than parameters
+    TRANSIENT_ATTRIBUTES = {"paths", "time_grid", "_data", "random_state", "seed", "sample_index_cache",
+                            "instrumentation"}
+
+    def __init__(self, directory, max_size=100 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+        self.evict()
+
+    @staticmethod
+    def canonical(value):
+        """ Converts value into plain JSON data. Objects are described by their class name and
+            attributes, so equal option definitions map to equal descriptions. """
+
+        if value is None or isinstance(value, (bool, str)):
+            return value
+        if isinstance(value, (int, np.integer)):
+            return int(value)
+        if isinstance(value, (float, np.floating)):
+            return repr(float(value))
+        if isinstance(value, np.ndarray):
+            return [ResultCache.canonical(v) for v in value.tolist()]
+        if isinstance(value, (list, tuple)):
+            return [ResultCache.canonical(v) for v in value]
+        if isinstance(value, dict):
+            return {str(k): ResultCache.canonical(v) for (k, v) in value.items()}
+        if hasattr(value, "__dict__"):
+            return {"class": type(value).__name__,
+                    "attributes": ResultCache.canonical(vars(value))}
+        return repr(value)
+
+    def key(self, option_pricer, params, steps=None):
+        """ Returns the cache key of running a simulation of params.option with option_pricer. steps is
+            the number of steps actually simulated, if it differs from params.steps. """
+
+        pricer_parameters = {name: value for (name, value) in vars(option_pricer).items()
+                             if name not in ResultCache.TRANSIENT_ATTRIBUTES}
+        description = json.dumps({"pricer": ResultCache.canonical(pricer_parameters),
+                                   "params": ResultCache.canonical(params),
+                                   "steps": steps},
+                                  sort_keys=True)
+        return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+    def filename(self, key):
+        return os.path.join(self.directory, key + ".pkl")
+
+    def get(self, key):
+        filename = self.filename(key)
+        try:
+            with open(filename, "rb") as infile:
+                result = pickle.load(infile)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        os.utime(filename)
+        return result
+
+    def put(self, key, result):
+        filename = self.filename(key)
+        temp_filename = filename + ".tmp"
+        with open(temp_filename, "wb") as outfile:
+            pickle.dump(result, outfile)
+        os.replace(temp_filename, filename)
+        self.evict()
+
+    def evict(self):
+        """ Removes the least recently used results until the cache fits into max_size. """
+
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".pkl"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        entries.sort()
+
+        total_size = sum(size for (_, size, _) in entries)
+        for (_, size, name) in entries:
+            if total_size <= self.max_size:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total_size -= size
@@ -0,0 +1,46 @@
+import numpy as np
+
+
+class RunningStatistics:
+    """ Running count, mean and variance of a stream of values.
+
+    Batches of values are folded in with the parallel variant of Welford's algorithm (Chan et al.),
+    so only three numbers are kept no matter how many values have been seen.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        if len(values) == 0:
+            return
+        batch_mean = values.mean()
+        batch_m2 = ((values - batch_mean) ** 2).sum()
+        self.combine(len(values), batch_mean, batch_m2)
+
+    def merge(self, other):
+        self.combine(other.count, other.mean, other.m2)
+
+    def combine(self, count, mean, m2):
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return 0.0
+        return self.m2 / (self.count - 1)
+
+    @property
+    def standard_error(self):
+        if self.count < 2:
+            return 0.0
+        return np.sqrt(self.variance / self.count)
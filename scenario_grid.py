@@ -0,0 +1,142 @@
+from option_pricer import OptionPricer
+import numpy as np
+
+
+class ScenarioResult:
+    def __init__(self):
+        self.spot_multipliers = None
+        self.vol_shifts = None
+        self.rate_shifts = None
+        self.base_prices = None
+        self.prices = None
+        self.pnl = None
+        self.portfolio_pnl = None
+
+
+class ScenarioGrid:
+    """ Revaluation of options under a grid of spot, volatility and rate scenarios
+
+    All scenarios are priced from one cached matrix of standard normal shocks (common random numbers), so the
+    P&L of a scenario contains no Monte Carlo noise from resimulation and is exactly 0 for the unshocked
+    scenario. With the EXACT scheme the cumulative sums W of the scaled shocks are cached as well: the paths
+    of a scenario are S0 * exp((mu - sigma^2/2) * t + sigma * W), so a volatility or rate shift only
+    recomputes the exponent, and a spot shift only rescales the paths. With the EULER scheme the paths of
+    every volatility and rate scenario are rebuilt from the cached normals.
+
+    Rate shifts move the risk-free rate and the drift mu alike. Variance reduction other than antithetic
+    variates is not applied, and only the geometric Brownian motion (no model) is supported.
+    """
+
+    def __init__(self, option_pricer, simulations=10000, steps=100, time_to_maturity=None, sample_distance=None):
+        """ Arguments:
+            option_pricer: pricer with the base market parameters
+            simulations: number of Monte Carlo paths
+            steps: number of steps of the paths
+            time_to_maturity: time to maturity of the options (Default: maturity - start_time of the pricer)
+            sample_distance: sample interval for discrete sampling (Default: continuous sampling)
+        """
+
+        if option_pricer.model is not None:
+            raise ValueError("Scenario revaluation supports the geometric Brownian motion only")
+        self.option_pricer = option_pricer
+        self.simulations = simulations
+        self.steps = steps
+        self.time_to_maturity = time_to_maturity if time_to_maturity is not None else \
+            option_pricer.maturity - option_pricer.start_time
+        self.sample_distance = sample_distance
+        # Cached shocks per number of steps
+        self.normals = {}
+        self.brownian_paths = {}
+
+    def cached_normals(self, steps):
+        if steps not in self.normals:
+            self.normals[steps] = self.option_pricer.draw_normals(self.simulations, steps)
+        return self.normals[steps]
+
+    def cached_brownian_paths(self, steps, positions):
+        """ Returns W at the sampled positions of the time grid (position 0 being the start) and the
+            sampled times, measured from the start time. """
+
+        if steps not in self.brownian_paths:
+            pricer = self.option_pricer
+            dt = (pricer.maturity - pricer.start_time) / steps
+            brownian_paths = np.zeros((self.simulations, steps + 1))
+            np.cumsum(self.cached_normals(steps), axis=1, out=brownian_paths[:, 1:])
+            brownian_paths *= np.sqrt(dt)
+            self.brownian_paths[steps] = brownian_paths[:, positions]
+        return self.brownian_paths[steps]
+
+    def scenario_paths(self, steps, positions, times, asset_price, sigma, mu):
+        """ Returns the sampled paths of one volatility and rate scenario. """
+
+        pricer = self.option_pricer
+        if pricer.scheme == OptionPricer.EXACT:
+            paths = self.cached_brownian_paths(steps, positions) * sigma
+            paths += (mu - sigma ** 2 / 2) * times
+            np.exp(paths, out=paths)
+            paths *= asset_price
+            return paths
+
+        scenario_pricer = pricer.clone()
+        scenario_pricer.set_init_asset_price(asset_price)
+        scenario_pricer.set_sigma(sigma)
+        scenario_pricer.set_mu(mu)
+        return scenario_pricer.paths_from_normals(self.cached_normals(steps))[:, positions]
+
+    def revalue(self, options, spot_multipliers=(1, ), vol_shifts=(0, ), rate_shifts=(0, ), quantities=None):
+        """ Prices options in every scenario of the grid spot_multipliers x vol_shifts x rate_shifts.
+
+        Arguments:
+            options: list of options
+            spot_multipliers: factors applied to the initial asset price
+            vol_shifts: shifts added to sigma
+            rate_shifts: shifts added to the risk-free rate and mu
+            quantities: positions in options, to add up the P&L of the portfolio (Default: no portfolio)
+
+        Returns a ScenarioResult. Its prices and pnl are (options x spots x vols x rates) arrays; pnl is the
+        difference to the base_prices of the unshocked scenario.
+        """
+
+        pricer = self.option_pricer
+        spot_multipliers = np.asarray(spot_multipliers, dtype=float)
+        vol_shifts = np.asarray(vol_shifts, dtype=float)
+        rate_shifts = np.asarray(rate_shifts, dtype=float)
+
+        steps = pricer.required_steps(options, self.steps)
+        time_grid = pricer.make_time_grid(steps)
+        positions = np.arange(steps + 1)
+        if self.sample_distance is not None:
+            positions = pricer.sample_indices(time_grid, self.sample_distance)
+        times = time_grid[positions] - pricer.start_time
+
+        def prices(paths, discount_factor):
+            return [pricer.payoffs_from_paths(option, paths).mean() * discount_factor for option in options]
+
+        base_paths = self.scenario_paths(steps, positions, times, pricer.init_asset_price, pricer.sigma, pricer.mu)
+        base_prices = np.array(prices(base_paths, np.exp(-pricer.risk_free_rate * self.time_to_maturity)))
+        del base_paths
+
+        cube = np.empty((len(options), len(spot_multipliers), len(vol_shifts), len(rate_shifts)))
+        shocked_paths = None
+        for (j, vol_shift) in enumerate(vol_shifts):
+            for (k, rate_shift) in enumerate(rate_shifts):
+                paths = self.scenario_paths(steps, positions, times, pricer.init_asset_price,
+                                            pricer.sigma + vol_shift, pricer.mu + rate_shift)
+                discount_factor = np.exp(-(pricer.risk_free_rate + rate_shift) * self.time_to_maturity)
+                if shocked_paths is None:
+                    shocked_paths = np.empty_like(paths)
+                for (i, spot_multiplier) in enumerate(spot_multipliers):
+                    # Paths are proportional to the initial asset price
+                    np.multiply(paths, spot_multiplier, out=shocked_paths)
+                    cube[:, i, j, k] = prices(shocked_paths, discount_factor)
+
+        result = ScenarioResult()
+        result.spot_multipliers = spot_multipliers
+        result.vol_shifts = vol_shifts
+        result.rate_shifts = rate_shifts
+        result.base_prices = base_prices
+        result.prices = cube
+        result.pnl = cube - base_prices[:, None, None, None]
+        if quantities is not None:
+            result.portfolio_pnl = np.tensordot(np.asarray(quantities, dtype=float), result.pnl, axes=1)
+        return result
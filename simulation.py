@@ -1,13 +1,20 @@
-import matplotlib
-matplotlib.use('agg')
-import matplotlib.pyplot as plt
 import pandas as pd
-import numpy as np
-from scipy.stats import norm
-import math
+from parallel_executor import ParallelExecutor
+import copy
 import os
 
 
+def simulated_prices(option_pricer, params, options):
+    """ Runs one Monte Carlo simulation and prices all options from the same set of paths. """
+
+    option_pricer.run_monte_carlo_simulations(simulations=params.simulations,
+                                              steps=option_pricer.required_steps(options, params.steps))
+    sample_distance = None
+    if params.sampling_method == SimulationParameters.DISCRETE_SAMPLING:
+        sample_distance = params.sample_interval
+    return [result.price for result in option_pricer.price_options(options, params.time_to_maturity, sample_distance)]
+
+
 class SimulationParameters:
     (CONTINUOUS_SAMPLING, DISCRETE_SAMPLING) = range(2)
 
@@ -25,6 +32,7 @@ class SimulationParameters:
         self.time_to_maturity = 1
         self.plot_x_min = -2
         self.plot_x_max = 2
+        self.seed = None
 
     def set_sampling_method(self, method):
         self.sampling_method = method
@@ -45,11 +53,22 @@ class SimulationResult:
         self.errors_mean = None
         self.errors_stddev = None
         self.errors_variance = None
+        self.steps = None
 
 
 class Simulation:
-    def __init__(self, option_pricer):
+    def __init__(self, option_pricer, executor=None, cache=None, plot_sink=None):
+        """ Arguments:
+            option_pricer: the pricer to simulate with
+            executor: ParallelExecutor running the simulation runs (Default: serial runs)
+            cache: ResultCache of seeded simulations (Default: no cache)
+            plot_sink: receives every SimulationResult for plotting, e.g. a MatplotlibPlotSink
+                (Default: no plots)
+        """
         self.option_pricer = option_pricer
+        self.executor = executor
+        self.cache = cache
+        self.plot_sink = plot_sink
         self.result = SimulationResult()
 
     def write_result_to_file(self, params):
@@ -67,7 +86,7 @@ class Simulation:
         outfile.write("%d;%d;%d;%s;%s;%.4f;%.4f;%.4f;%.4f\n" %
                       (params.runs,
                        params.simulations,
-                       params.steps,
+                       self.result.steps,
                        params.sampling_name,
                        "n/a" if params.sampling_name == "cont" else ("%.2f" % params.sample_interval),
                        self.result.price_mean,
@@ -77,67 +96,95 @@ class Simulation:
         outfile.close()
 
     def write_plot(self, params):
-        # Clear plot
-
-        plt.clf()
-
-        # Create plot
-
-        n, bins, patches = plt.hist(self.result.errors, 20, density=True, facecolor='gray')
-        x_max = (max([abs(b) for b in bins]))
-        x_max = math.ceil(x_max * 10) / 10
-        if x_max < 1:
-            x_max = 1
-
-        # Create data for normal distribution with mean = 0, and variance = error_variance
-
-        norm_x = np.arange(-x_max, x_max, 0.01)
-        norm_y = [norm.pdf(i, loc=0, scale=np.sqrt(self.result.errors_variance)) for i in norm_x]
-
-        y_max = math.ceil(max(n) * 10) / 10
-        plt.plot(norm_x, norm_y, color="black", linewidth=0.5)
-        plt.xlabel('Error')
-        plt.ylabel('Probability')
-        plt.axis([-x_max, x_max, 0, y_max])
-        plt.grid(False)
-
-        # Save plot as PNG
-
-        params_str = "-%d-%d-%s%s" % (params.runs,
-                                      params.simulations,
-                                      params.sampling_name,
-                                      "" if params.sampling_method == SimulationParameters.CONTINUOUS_SAMPLING
-                                         else ("-%.2f" % params.sample_interval))
-        filename = params.option_name + params_str + ".png"
-        plt.savefig(filename)
+        if self.plot_sink is not None:
+            self.plot_sink.write(self.result, params)
+
+    def simulate_prices(self, params, options, name):
+        """ Runs params.runs simulations and returns for each run the list of prices of options. """
+
+        if self.executor is None and params.seed is None:
+            run_prices = []
+            for i in range(params.runs):
+                print("%s - step %d/%d, N=%d" % (name, i, params.runs, params.simulations))
+                run_prices.append(simulated_prices(self.option_pricer, params, options))
+            return run_prices
+
+        # Every run gets its own random number stream, so results are reproducible for a given
+        # seed independent of the number of workers
+        executor = self.executor if self.executor is not None else ParallelExecutor(1)
+        print("%s - %d runs on %d workers, N=%d" % (name, params.runs, executor.workers, params.simulations))
+        seeds = executor.spawn_seeds(params.seed, params.runs)
+        return executor.map(simulated_prices, [(self.option_pricer.clone(seed), params, options) for seed in seeds])
 
     def run(self, params):
         """ Run several calculations for Monte Carlo simulation and save histogram of errors in histogram."""
 
-        errors = []
-        prices = []
-        print("Running simulations for " + params.option_name)
-        for i in range(params.runs):
-            print("%s - step %d/%d, N=%d" % (params.option_name, i, params.runs, params.simulations))
-            self.option_pricer.run_monte_carlo_simulations(simulations=params.simulations, steps=params.steps)
-            price = 0
-            if params.sampling_method == SimulationParameters.CONTINUOUS_SAMPLING:
-                price = self.option_pricer.simulated_price_continuous_sampling(params.option, params.time_to_maturity)
-            elif params.sampling_method == SimulationParameters.DISCRETE_SAMPLING:
-                price = self.option_pricer.simulated_price_discrete_sampling(params.option, params.time_to_maturity,
-                                                                        params.sample_interval)
-            prices.append(price)
-            errors.append(price - params.option_real_price)
+        return self.run_many(params, [(params.option_name, params.option, params.option_real_price)])[0]
+
+    def run_many(self, params, options):
+        """ Like run, but prices several options from one shared set of paths per run.
+
+        Arguments:
+            params: simulation parameters, the option fields are ignored
+            options: list of (option_name, option, option_real_price)
+
+        Returns the list of mean prices in the order of options.
+        """
+
+        options_params = []
+        for (name, option, real_price) in options:
+            option_params = copy.copy(params)
+            option_params.option = option
+            option_params.option_name = name
+            option_params.option_real_price = real_price
+            options_params.append(option_params)
+
+        # Results of seeded simulations are deterministic and can be taken from the cache
+        # Steps actually simulated: the shared paths may need fewer steps than params.steps
+        steps = self.option_pricer.required_steps([option for (_, option, _) in options], params.steps)
+        keys = [None] * len(options)
+        results = [None] * len(options)
+        if self.cache is not None and params.seed is not None:
+            keys = [self.cache.key(self.option_pricer, option_params, steps) for option_params in options_params]
+            results = [self.cache.get(key) for key in keys]
+
+        if any(result is None for result in results):
+            name = options[0][0] if len(options) == 1 else "%d options" % len(options)
+            print("Running simulations for " + name)
+            run_prices = self.simulate_prices(params, [option for (_, option, _) in options], name)
+            for (k, option_params) in enumerate(options_params):
+                if results[k] is None:
+                    results[k] = self.calculate_result(option_params, [prices[k] for prices in run_prices])
+                    if keys[k] is not None:
+                        self.cache.put(keys[k], results[k])
+
+        instrumentation = self.option_pricer.instrumentation
+        price_means = []
+        for (option_params, result) in zip(options_params, results):
+            result.steps = steps
+            self.result = result
+            with instrumentation.phase("csv_write"):
+                self.write_result_to_file(option_params)
+            with instrumentation.phase("plot_rendering"):
+                self.write_plot(option_params)
+            price_means.append(result.price_mean)
+        return price_means
+
+    def calculate_result(self, params, prices):
+        """ Calculates price mean and error statistics of the prices of all runs. """
+
+        errors = [price - params.option_real_price for price in prices]
 
         # Calculate histogram and price mean and error parameters
 
-        self.result.prices = pd.Series(prices)
-        self.result.price_mean = self.result.prices.mean()
-        self.result.errors = pd.Series(errors)
-        self.result.errors_stddev = self.result.errors.std()
-        self.result.errors_variance = self.result.errors.var()
-
-        self.write_result_to_file(params)
-        self.write_plot(params)
-
-        return self.result.price_mean
+        result = SimulationResult()
+        result.option_name = params.option_name
+        result.sampling_method = params.sampling_method
+        result.sampling_interval = params.sample_interval
+        result.real_price = params.option_real_price
+        result.prices = pd.Series(prices)
+        result.price_mean = result.prices.mean()
+        result.errors = pd.Series(errors)
+        result.errors_stddev = result.errors.std()
+        result.errors_variance = result.errors.var()
+        return result
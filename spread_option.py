@@ -0,0 +1,63 @@
+from option_types import OptionType
+import numpy as np
+from scipy.stats import norm
+
+
+class SpreadOption:
+    """ Spread Call or Put Option on the difference of two asset prices """
+
+    path_dependent = False
+
+    def __init__(self, strike, option_type=OptionType.CALL, long_asset=0, short_asset=1):
+        self.strike = strike
+        self.option_type = option_type
+        self.long_asset = long_asset
+        self.short_asset = short_asset
+
+    def payoff(self, asset_prices):
+        spread = asset_prices[self.long_asset] - asset_prices[self.short_asset]
+        if self.option_type == OptionType.CALL:
+            return max(spread - self.strike, 0)
+        elif self.option_type == OptionType.PUT:
+            return max(self.strike - spread, 0)
+        return 0
+
+    def payoff_from_paths(self, paths):
+        """ Vectorized payoff for an (assets x simulations x steps+1) array of asset price paths. """
+        spreads = paths[self.long_asset, :, -1] - paths[self.short_asset, :, -1]
+        if self.option_type == OptionType.CALL:
+            return np.maximum(spreads - self.strike, 0)
+        elif self.option_type == OptionType.PUT:
+            return np.maximum(self.strike - spreads, 0)
+        return np.zeros(paths.shape[1])
+
+    def black_scholes_price(self, asset_prices, sigmas, correlation, r, time_to_maturity=1):
+        """ Calculates value of option with Kirk's approximation (exact for strike 0, Margrabe's formula).
+
+        Arguments:
+            asset_prices: current asset prices of all assets
+            sigmas: volatilities of all assets
+            correlation: correlation of the long and the short asset
+            r: the risk-free interest rate
+            time_to_maturity: time to maturity in years
+        """
+
+        t = time_to_maturity
+        long_price = asset_prices[self.long_asset]
+        short_price = asset_prices[self.short_asset]
+        long_sigma = sigmas[self.long_asset]
+        short_sigma = sigmas[self.short_asset]
+
+        discounted_strike = self.strike * np.exp(-r * t)
+        weight = short_price / (short_price + discounted_strike)
+        sigma = np.sqrt(long_sigma ** 2 - 2 * correlation * long_sigma * short_sigma * weight +
+                        (short_sigma * weight) ** 2)
+        d1 = (np.log(long_price / (short_price + discounted_strike)) + sigma ** 2 / 2 * t) / (sigma * np.sqrt(t))
+        d2 = d1 - sigma * np.sqrt(t)
+        call_price = long_price * norm.cdf(d1) - (short_price + discounted_strike) * norm.cdf(d2)
+        if self.option_type == OptionType.CALL:
+            return call_price
+        elif self.option_type == OptionType.PUT:
+            # Put-call parity
+            return call_price - long_price + short_price + discounted_strike
+        return 0
@@ -1,10 +1,11 @@
 from option_pricer import OptionPricer
-from binary_option import BinaryOption
-from fixed_lookback_option import FixedLookbackOption
-from floating_lookback_option import FloatingLookbackOption
-from option import Option
-from option_types import OptionType
+from option_shortcuts import BARRIER_CODES, create_option, create_option_shortcuts, reference_price
 from simulation import *
+from plot_sink import MatplotlibPlotSink
+from parallel_executor import ParallelExecutor
+from result_cache import ResultCache
+from instrumentation import Instrumentation
+import json
 from optparse import OptionParser
 
 if __name__ == "__main__":
@@ -24,6 +25,8 @@ if __name__ == "__main__":
                       help="Strike of option (Default: 120)", default=120)
     parser.add_option("-p", "--binary_payoff", dest="binary_payoff", type="float",
                       help="Payoff of binary option (Default: 100)", default=100)
+    parser.add_option("-b", "--barrier", dest="barrier", type="float",
+                      help="Barrier of barrier options (Default: none)", default=None)
     parser.add_option("--runs", dest="runs", type="int",
                       help="Simulations runs (Default: 100)", default=50)
     parser.add_option("--sim", dest="simulations", type="string",
@@ -33,6 +36,32 @@ if __name__ == "__main__":
                       help="Number of price movements within each MC simulation (Default: 100)", default=100)
     parser.add_option("-i", dest="sample_interval", type="float",
                       help="Sample interval for discrete sampling (Default: 0.1)", default=0.1)
+    parser.add_option("--scheme", dest="scheme", type="choice", choices=["euler", "exact"],
+                      help="Discretisation scheme of the asset price: euler or exact (Default: euler)",
+                      default="euler")
+    parser.add_option("--sobol", dest="sobol", action="store_true",
+                      help="Use scrambled Sobol points with Brownian bridge construction instead of pseudo random "
+                           "numbers", default=False)
+    parser.add_option("--antithetic", dest="antithetic", action="store_true",
+                      help="Use antithetic variates", default=False)
+    parser.add_option("--control_variates", dest="control_variates", action="store_true",
+                      help="Use control variates", default=False)
+    parser.add_option("--workers", dest="workers", type="int",
+                      help="Number of worker processes for the simulation runs (Default: 1)", default=1)
+    parser.add_option("--seed", dest="seed", type="int",
+                      help="Seed of the random number generator (Default: none)", default=None)
+    parser.add_option("--cache", dest="cache", type="string",
+                      help="Directory of the result cache, used for seeded runs (Default: no cache)", default=None)
+    parser.add_option("--cache_size", dest="cache_size", type="float",
+                      help="Maximum size of the result cache in MB (Default: 100)", default=100)
+    parser.add_option("--no_plots", dest="no_plots", action="store_true",
+                      help="Do not plot the error histograms", default=False)
+    parser.add_option("--report", dest="report", type="string",
+                      help="Record phase timings, counters and memory and write them as JSON to this file "
+                           "(Default: no instrumentation)", default=None)
+    parser.add_option("--profile", dest="profile", type="string",
+                      help="Profile with cProfile and dump the statistics to this file (Default: no profiling)",
+                      default=None)
     parser.add_option("-o", "--option_types", dest="option_codes", type="string",
                       help="Option types. Possible values: "
                         "CO = call options, "
@@ -43,11 +72,23 @@ if __name__ == "__main__":
                         "XLPO = fixed strike lookback put options, "
                         "BCO = binary call options, "
                         "BPO = binary put options, "
+                        "ACO = Asian call options, "
+                        "APO = Asian put options, "
+                        "UOCO, UOPO, DOCO, DOPO, UICO, UIPO, DICO, DIPO = up/down-and-out/in barrier call/put "
+                        "options (need -b), "
                         "A list can be give (e.g. -o CO,PO,XLPO) "
                         "(Default: CO,PO,FLCO,FLPO,XLCO,BCO,BPO)",
                       default="CO,PO,FLCO,FLPO,XLCO,XLPO,BCO,BPO")
 
     (opts, args) = parser.parse_args()
+    if opts.profile is not None and opts.workers > 1:
+        parser.error("--profile requires a single worker")
+    for option_code in opts.option_codes.split(","):
+        try:
+            create_option(option_code, opts.strike, opts.barrier, opts.binary_payoff)
+        except ValueError as error:
+            parser.error("%s: barrier options need -b" % option_code if option_code in BARRIER_CODES
+                         else str(error))
 
     # Market parameters
     risk_free_interest_rate = opts.r
@@ -70,6 +111,7 @@ if __name__ == "__main__":
     params.start_time = start_time
     params.maturity = maturity
     params.time_to_maturity = time_to_maturity
+    params.seed = opts.seed
     sims = opts.simulations
     list_of_simulations = [int(x) for x in sims.split(",")]
     sample_interval = opts.sample_interval
@@ -82,60 +124,67 @@ if __name__ == "__main__":
     option_pricer.set_sigma(sigma)
     option_pricer.set_start_time(params.start_time)
     option_pricer.set_maturity(params.maturity)
-
-    simulation = Simulation(option_pricer)
-
-    option_shortcuts = {
-        "CO": ("Plain Vanilla Call Option", Option(strike)),
-        "PO": ("Plain Vanilla Put Option", Option(strike, option_type=OptionType.PUT)),
-        "FLCO": ("Floating Lookback Call Option", FloatingLookbackOption()),
-        "FLPO": ("Floating Lookback Put Option", FloatingLookbackOption(option_type=OptionType.PUT)),
-        "XLCO": ("Fixed Lookback Call Option", FixedLookbackOption(strike)),
-        "XLPO": ("Fixed Lookback Put Option", FixedLookbackOption(strike, option_type=OptionType.PUT)),
-        "BCO": ("Binary Call Option", BinaryOption(strike, payoff=binary_payoff)),
-        "BPO": ("Binary Put Option", BinaryOption(strike, payoff=binary_payoff, option_type=OptionType.PUT))
-    }
+    option_pricer.set_scheme(OptionPricer.EXACT if opts.scheme == "exact" else OptionPricer.EULER)
+    option_pricer.set_sequence(OptionPricer.SOBOL if opts.sobol else OptionPricer.PSEUDO_RANDOM)
+    option_pricer.set_antithetic(opts.antithetic)
+    option_pricer.set_control_variates(opts.control_variates)
+    instrumentation = None
+    if opts.report is not None or opts.profile is not None:
+        instrumentation = Instrumentation()
+        option_pricer.set_instrumentation(instrumentation)
+        if opts.profile is not None:
+            instrumentation.start_profiling()
+
+    executor = None
+    if opts.workers > 1:
+        executor = ParallelExecutor(opts.workers)
+    cache = None
+    if opts.cache is not None:
+        cache = ResultCache(opts.cache, int(opts.cache_size * 1024 * 1024))
+    plot_sink = None
+    if not opts.no_plots:
+        # Figures are rendered in a background thread while the simulations go on
+        plot_sink = MatplotlibPlotSink(MatplotlibPlotSink.THREAD)
+    simulation = Simulation(option_pricer, executor, cache, plot_sink)
+
+    option_shortcuts = create_option_shortcuts(strike, binary_payoff, opts.barrier)
 
     option_codes = opts.option_codes
     option_codes = option_codes.split(",")
 
+    # All options are priced from one shared set of paths per simulation run
+    options = []
     for option_code in option_codes:
         (name, option) = option_shortcuts[option_code]
-        params.option = option
-        params.option_name = name
-
-        # Calculate Black Scholes price
-        if "Fixed" in name:
-            # Only for fixed lookback options
-            params.option_real_price = params.option.black_scholes_price(asset_price,
-                                                                         asset_price,  # asset_min
-                                                                         asset_price,  # asset_max
-                                                                         sigma,
-                                                                         risk_free_interest_rate,
-                                                                         time_to_maturity)
-        else:
-            params.option_real_price = params.option.black_scholes_price(asset_price,
-                                                                         sigma,
-                                                                         risk_free_interest_rate,
-                                                                         time_to_maturity)
-
-        for N in list_of_simulations:
-            print("Running simulation for " + name)
-            params.simulations = N  # Number of MC simulations
-
-            # Simulate continuous sampling
-            params.set_sampling_method(SimulationParameters.CONTINUOUS_SAMPLING)
-            cont_price = simulation.run(params)
-
-            # Simulate discrete sampling
-            params.set_sampling_method(SimulationParameters.DISCRETE_SAMPLING)
-            params.sample_interval = sample_interval
-            disc_price = simulation.run(params)
-
-            # Output results to console
-            print(params.option_name + " (MC Cont. Sampling): %.2f" % cont_price)
-            print(params.option_name + " (MC Disc. Sampling@%.2f): %.2f" % (params.sample_interval,
-                                                                            disc_price))
-            print(params.option_name + " (Black Scholes): %.4f" % (params.option_real_price, ))
-
 
+        # Calculate Black Scholes price (NaN if there is no closed form)
+        real_price = reference_price(option, asset_price, sigma, risk_free_interest_rate, time_to_maturity)
+        options.append((name, option, real_price))
+
+    for N in list_of_simulations:
+        params.simulations = N  # Number of MC simulations
+
+        # Simulate continuous sampling
+        params.set_sampling_method(SimulationParameters.CONTINUOUS_SAMPLING)
+        cont_prices = simulation.run_many(params, options)
+
+        # Simulate discrete sampling
+        params.set_sampling_method(SimulationParameters.DISCRETE_SAMPLING)
+        params.sample_interval = sample_interval
+        disc_prices = simulation.run_many(params, options)
+
+        # Output results to console
+        for ((name, option, real_price), cont_price, disc_price) in zip(options, cont_prices, disc_prices):
+            print(name + " (MC Cont. Sampling): %.2f" % cont_price)
+            print(name + " (MC Disc. Sampling@%.2f): %.2f" % (params.sample_interval, disc_price))
+            print(name + " (Black Scholes): %.4f" % (real_price, ))
+
+    if plot_sink is not None:
+        plot_sink.close()
+
+    if instrumentation is not None:
+        if opts.profile is not None:
+            instrumentation.stop_profiling(opts.profile)
+        if opts.report is not None:
+            with open(opts.report, "w") as outfile:
+                json.dump(instrumentation.report(), outfile, indent=2)